@@ -1,25 +1,108 @@
+import log
+import metrics
+import pactl_interface
+import tracing
+
+from .output_logger import OutputLogger
 from .sink_switcher import SinkSwitcher
 from .source_switcher import SourceSwitcher
 
 
 class AudioSwitcher:
     def __init__(self, config):
+        self.state = pactl_interface.State(OutputLogger())
+
         self.sink_switcher = None
         if config.audio_change_sink():
-            self.sink_switcher = SinkSwitcher(config)
+            self.sink_switcher = SinkSwitcher(config, self.state)
 
         self.source_switcher = None
         if config.audio_change_source():
-            self.source_switcher = SourceSwitcher(config)
-
-    def switch_to_vr(self):
-        if self.sink_switcher is not None:
-            self.sink_switcher.switch_to_vr()
-        if self.source_switcher is not None:
-            self.source_switcher.switch_to_vr()
-
-    def switch_to_normal(self):
-        if self.sink_switcher is not None:
-            self.sink_switcher.switch_to_normal()
-        if self.source_switcher is not None:
-            self.source_switcher.switch_to_normal()
+            self.source_switcher = SourceSwitcher(config, self.state)
+
+        self.subscription = None
+        self.last_fingerprint = None  # see switch_to_vr_if_changed()
+
+    def get_switchers(self):
+        return [switcher for switcher in [self.sink_switcher, self.source_switcher] if switcher is not None]
+
+    def switch_to_vr(self, wait=True):
+        """
+        Returns the number of stream connections which were moved.
+        """
+        self.invalidate_state()
+        return sum(self.switch(switcher, 'vr', wait) for switcher in self.get_switchers())
+
+    @staticmethod
+    def get_fingerprint():
+        """
+        Returns the output of `pactl list short`, which lists all streams, stream connections, clients and cards.
+        """
+        return_code, stdout, stderr = pactl_interface.utlis.run(['pactl', 'list', 'short'], assert_success=True)
+        return stdout
+
+    def switch_to_vr_if_changed(self):
+        """
+        Like `switch_to_vr(wait=False)`, but only one cheap query is made if nothing changed since the previous call.
+        """
+        fingerprint = self.get_fingerprint()
+        if fingerprint == self.last_fingerprint and not any(switcher.has_pending_work()
+                                                            for switcher in self.get_switchers()):
+            metrics.increment('audio_switches_skipped_total')
+            return 0
+
+        move_count = self.switch_to_vr(wait=False)
+        # after a move the fingerprint changed, the next call makes sure nothing else needs to be moved
+        self.last_fingerprint = fingerprint if move_count == 0 else None
+        return move_count
+
+    def switch_to_normal(self, wait=True):
+        self.invalidate_state()
+        return sum(self.switch(switcher, 'normal', wait) for switcher in self.get_switchers())
+
+    @staticmethod
+    def switch(switcher, device_type, wait=True):
+        """
+        Switches only `switcher`. Different switchers can be switched in parallel (see `SteamvrUtils.transition()`).
+        """
+        with switcher.lock, metrics.Timer('stream_switch_seconds', {'type': switcher.get_stream_type_name(),
+                                                                    'device_type': device_type}), \
+                tracing.Span('switch {} to {}'.format(switcher.get_stream_type_name(), device_type), 'audio'):
+            if device_type == 'vr':
+                return switcher.switch_to_vr(wait)
+            elif device_type == 'normal':
+                return switcher.switch_to_normal(wait)
+            else:
+                raise NotImplementedError()
+
+    def invalidate_state(self):
+        # While subscribed, self.state is kept up to date by events.
+        if not self.is_subscribed():
+            self.state.invalidate()
+
+    def is_subscribed(self):
+        return self.subscription is not None and self.subscription.is_running()
+
+    def subscribe(self):
+        """
+        Moves new stream connections to the vr streams as soon as they are created, until `unsubscribe()` is called.
+        """
+        self.unsubscribe()
+        log.i('AudioSwitcher subscribing to audio server events')
+        self.subscription = pactl_interface.utlis.subscribe(self.handle_event)
+        self.state.invalidate()  # changes before the subscription started were missed
+
+    def unsubscribe(self):
+        if self.subscription is not None:
+            self.subscription.stop()
+            self.subscription = None
+        self.last_fingerprint = None  # see switch_to_vr_if_changed()
+
+    def handle_event(self, event):
+        if self.subscription is None:
+            return
+
+        self.state.handle_event(event)
+        for switcher in self.get_switchers():
+            with switcher.lock:
+                switcher.handle_event(event)
@@ -0,0 +1,80 @@
+import enum
+import threading
+import time
+
+import log
+import tracing
+
+
+class PortRescan:
+    """
+    Makes the audio server rescan the ports of the card of `sink`: suspends the sink, polls (with increasing
+    intervals) until a port matching `product_name_regex` appears or `timeout` seconds passed, then resumes the sink.
+    Every step runs in a `threading.Timer`, `start()` returns immediately.
+    """
+
+    class Stage(enum.Enum):
+        CREATED = enum.auto()
+        SUSPENDED = enum.auto()
+        DONE = enum.auto()
+
+    def __init__(self, config, card_cache, sink, product_name_regex, timeout, first_interval=0.25, max_interval=2.0):
+        self.config = config
+        self.card_cache = card_cache
+        self.sink = sink
+        self.product_name_regex = product_name_regex
+        self.timeout = timeout
+        self.interval = first_interval
+        self.max_interval = max_interval
+
+        self.stage = self.Stage.CREATED
+        self.deadline = None
+        self.port = None  # the port which appeared, if any
+        self.done = threading.Event()
+
+    def start(self):
+        log.d('PortRescan of {} started'.format(self.sink.name))
+        self.sink.set_suspend_state(self.config, True)
+        self.stage = self.Stage.SUSPENDED
+        self.deadline = time.monotonic() + self.timeout
+        self.schedule()
+        return self
+
+    def schedule(self):
+        delay = max(min(self.interval, self.deadline - time.monotonic()), 0)
+        self.interval = min(self.interval * 2, self.max_interval)
+        threading.Timer(delay, self.poll).start()
+
+    def poll(self):
+        try:
+            with tracing.Span('port rescan poll', 'audio', {'sink': self.sink.name}):
+                if self.product_name_regex is not None:
+                    self.port = self.card_cache.find_port(self.product_name_regex)
+        except Exception as e:
+            log.e('PortRescan failed to list cards: {}'.format(e))
+
+        if self.port is None and time.monotonic() < self.deadline:
+            self.schedule()
+            return
+
+        self.finish()
+
+    def finish(self):
+        # Causes a rescan of connected ports, only works if time passes between suspend and resume
+        try:
+            self.sink.set_suspend_state(self.config, False)
+        finally:
+            self.card_cache.invalidate()  # the product names of the ports might have changed
+            self.stage = self.Stage.DONE
+            self.done.set()
+
+        log.d('PortRescan of {} done after {:.2f}s, found port: {}'.format(
+            self.sink.name, self.timeout - (self.deadline - time.monotonic()),
+            self.port.name if self.port is not None else None))
+
+    def is_running(self):
+        return self.stage == self.Stage.SUSPENDED
+
+    def wait(self):
+        self.done.wait()
+        return self.port
@@ -1,17 +1,16 @@
-import re
-import time
-
 import log
-import pactl_interface
 
+from .port_rescan import PortRescan
 from .stream_switcher import StreamSwitcher
 
 
 # tested with pactl version 13.99.1, 14.2
 
 class SinkSwitcher(StreamSwitcher):
-    def __init__(self, config):
-        super().__init__(config, StreamSwitcher.StreamType.sink)
+    def __init__(self, config, state=None):
+        super().__init__(config, StreamSwitcher.StreamType.sink, state)
+
+        self.port_rescan = None  # the most recent PortRescan, until the next switch after it finished
 
     def get_vr_stream_regex(self):
         return self.config.audio_vr_sink_regex()
@@ -20,51 +19,67 @@ class SinkSwitcher(StreamSwitcher):
         return self.config.audio_normal_sink_regex()
 
     def get_all_streams(self):
-        return pactl_interface.Sink.get_all_sinks(self.output_logger)
+        return self.state.get_sinks()
 
     def get_all_stream_connections(self):
-        return pactl_interface.SinkInput.get_all_sink_inputs(self.output_logger)
+        return self.state.get_sink_inputs()
 
     def get_move_stream_connection_command(self):
         return 'move-sink-input'
 
-    def switch_to_stream(self, stream, device_type):
-        if self.config.audio_set_card_port():
-            port = self.get_port(device_type)
+    def get_stream_connection_facility(self):
+        return 'sink-input'
 
-            if port is not None:
-                port.card.set_profile(self.config, port.profiles[0])
+    def switch_to_stream(self, stream, device_type, wait=True):
+        if self.config.audio_set_card_port():
+            if self.port_rescan is not None and self.port_rescan.is_running():
+                log.d('Waiting for the PortRescan of {}'.format(self.port_rescan.sink.name))
             else:
-                stream.set_suspend_state(self.config, True)
-                time.sleep(self.config.audio_card_rescan_pause_time())
-                # Causes a rescan of connected ports, only works if time passes between suspend and resume
-                stream.set_suspend_state(self.config, False)
+                self.port_rescan = None
+                port = self.get_port(device_type)
 
-        self.set_stream_for_all_stream_connections(stream)
+                if port is not None:
+                    port.card.set_profile(self.config, port.profiles[0])
+                else:
+                    regex = self.get_port_regex(device_type)
+                    self.port_rescan = PortRescan(self.config, self.state.card_cache, stream,
+                                                  self.config.compiled_regex(regex) if regex is not None else None,
+                                                  self.config.audio_card_rescan_pause_time()).start()
 
-    def get_port(self, device_type):
+            if wait and self.port_rescan is not None and self.port_rescan.is_running():
+                port = self.port_rescan.wait()
+                if port is not None:
+                    port.card.set_profile(self.config, port.profiles[0])
+
+        return self.set_stream_for_all_stream_connections(stream)
+
+    def has_pending_work(self):
+        # the port found by the PortRescan still needs to be selected
+        return super().has_pending_work() or self.port_rescan is not None
+
+    def get_port_regex(self, device_type):
         if device_type == "vr":
-            card_port_product_name_regex = self.config.audio_card_port_vr_product_name_regex()
+            return self.config.audio_card_port_vr_product_name_regex()
         elif device_type == "normal":
-            card_port_product_name_regex = self.config.audio_card_port_normal_product_name_regex()
+            return self.config.audio_card_port_normal_product_name_regex()
         else:
             raise NotImplementedError()
 
+    def get_port(self, device_type):
+        card_port_product_name_regex = self.get_port_regex(device_type)
+
         if card_port_product_name_regex is None:
             log.d(
                 "Skipping port selection for {device_type} device because card_port_{device_type}_product_name_regex is not set.".format(
                     device_type=device_type))
             return None
 
-        cards = pactl_interface.Card.get_all_cards()
-        for card in cards:
-            for port in card.ports:
-                if port.product_name is not None:
-                    if re.match(card_port_product_name_regex, port.product_name):
-                        return port
+        port = self.state.card_cache.find_port(self.config.compiled_regex(card_port_product_name_regex))
+        if port is not None:
+            return port
 
         debug_output = ''
-        for card in cards:
+        for card in self.state.card_cache.cards_of_last_miss:
             debug_output += card.name + '\n'
             for port in card.ports:
                 debug_output += '    {}\n'.format(port.product_name if port.product_name is not None else '-')
@@ -1,13 +1,11 @@
-import pactl_interface
-
 from .stream_switcher import StreamSwitcher
 
 
 # tested with pactl version 13.99.1
 
 class SourceSwitcher(StreamSwitcher):
-    def __init__(self, config):
-        super().__init__(config, StreamSwitcher.StreamType.source)
+    def __init__(self, config, state=None):
+        super().__init__(config, StreamSwitcher.StreamType.source, state)
 
     def get_vr_stream_regex(self):
         return self.config.audio_vr_source_regex()
@@ -16,13 +14,16 @@ class SourceSwitcher(StreamSwitcher):
         return self.config.audio_normal_source_regex()
 
     def get_all_streams(self):
-        return pactl_interface.Source.get_all_sources(self.output_logger)
+        return self.state.get_sources()
 
     def get_all_stream_connections(self):
-        return pactl_interface.SourceOutput.get_all_source_outputs(self.output_logger)
+        return self.state.get_source_outputs()
 
     def get_move_stream_connection_command(self):
         return 'move-source-output'
 
-    def switch_to_stream(self, stream, device_type):
-        self.set_stream_for_all_stream_connections(stream)
+    def get_stream_connection_facility(self):
+        return 'source-output'
+
+    def switch_to_stream(self, stream, device_type, wait=True):
+        return self.set_stream_for_all_stream_connections(stream)
@@ -1,9 +1,11 @@
 import enum
-import re
+import threading
 import time
 
 import log
+import metrics
 import pactl_interface
+import tracing
 
 from .output_logger import OutputLogger
 
@@ -32,13 +34,21 @@ class StreamSwitcher:
 
             return True
 
-    def __init__(self, config, stream_type):
+    max_move_batch_size = 32  # limits the number of pactl processes running at the same time
+
+    def __init__(self, config, stream_type, state=None):
         self.config = config
         self.stream_type = stream_type
 
-        self.output_logger = OutputLogger()
+        if state is None:
+            state = pactl_interface.State(OutputLogger())
+        self.state = state  # shared with other StreamSwitchers (see AudioSwitcher)
+        self.output_logger = state.output_logger
+
+        self.failed_stream_connections = {}  # stream_connection.id -> Failure, for which move-sink-input failed
 
-        self.failed_stream_connections = []  # stream_connections for which move-sink-input failed (Failure class)
+        # events are handled in a separate thread and switchers can be switched in parallel (see AudioSwitcher)
+        self.lock = threading.RLock()
 
         vr_stream_regex = self.get_vr_stream_regex()
         normal_stream_regex = self.get_normal_stream_regex()
@@ -79,9 +89,12 @@ class StreamSwitcher:
     def get_move_stream_connection_command(self):
         raise NotImplementedError()
 
+    def get_stream_connection_facility(self):
+        raise NotImplementedError()
+
     def find_matching_stream(self, streams, regex, name):
         matches = [
-            stream for stream in streams if re.match(regex, stream.name)
+            stream for stream in streams if self.config.compiled_regex(regex).match(stream.name)
         ]
         if len(matches) == 1:
             return matches[0]
@@ -94,90 +107,172 @@ class StreamSwitcher:
                                                                                                    self.stream_type,
                                                                                                    regex))
 
-    def switch_to_stream(self, stream, device_type):
+    def switch_to_stream(self, stream, device_type, wait=True):
+        """
+        Returns the number of stream_connections which were moved to `stream`.
+        With `wait=False`, slow parts (see `PortRescan`) continue in the background and are finished by a later call.
+        """
         raise NotImplementedError()
 
-    def switch_to_vr(self):
+    def switch_to_vr(self, wait=True):
         old_vr_stream = self.vr_stream
         streams = self.get_all_streams()
         self.vr_stream = self.find_matching_stream(streams, self.get_vr_stream_regex(), "vr")
         if self.vr_stream.name != old_vr_stream.name:
             log.d('New vr {}: {}'.format(self.get_stream_type_name(), self.vr_stream.name))
 
-        self.switch_to_stream(self.vr_stream, "vr")
+        return self.switch_to_stream(self.vr_stream, "vr", wait)
 
-    def switch_to_normal(self):
-        self.switch_to_stream(self.normal_stream, "normal")
+    def switch_to_normal(self, wait=True):
+        return self.switch_to_stream(self.normal_stream, "normal", wait)
+
+    def has_pending_work(self):
+        """
+        Returns True if switching again might change something even if no stream or stream_connection changed.
+        """
+        return any(failure.failure_count <= 10 for failure in self.failed_stream_connections.values())
 
     def set_stream_for_all_stream_connections(self, stream):
+        """
+        Returns the number of stream_connections which were moved to `stream`.
+        """
         if self.config.dry_run():
             log.w('Skipping because of dry run')
-            return
+            return 0
 
         # verify stream name exists before proceeding
         streams = self.get_all_streams()
-        found = False
+        current_stream = None
         for s in streams:
             if s.name == stream.name:
-                found = True
+                current_stream = s
 
-        if not found:
+        if current_stream is None:
             log.w('Skipping {} since the {} name does not exist'.format(
                 self.get_move_stream_connection_command(), self.get_stream_type_name()
             ))
-            return
+            return 0
 
         stream_connections = self.get_all_stream_connections()
-        pactl_interface.Client.get_client_names(stream_connections)
+
+        # failures of stream_connections which no longer exist are irrelevant (see has_pending_work())
+        stream_connection_ids = {stream_connection.id for stream_connection in stream_connections}
+        for stream_connection_id in list(self.failed_stream_connections.keys()):
+            if stream_connection_id not in stream_connection_ids:
+                del self.failed_stream_connections[stream_connection_id]
+
         stream_connections = self.filter_by_client_name(stream_connections)
+        # moving stream_connections which are already connected to the stream would change nothing
+        stream_connections = [
+            stream_connection for stream_connection in stream_connections
+            if stream_connection.stream_id != current_stream.id
+        ]
+
+        return self.move_stream_connections(stream_connections, stream)
 
+    def move_stream_connections(self, stream_connections, stream):
+        """
+        Returns the number of stream_connections for which a move was attempted.
+        All moves are executed as batches (see `pactl_interface.utlis.run_batch()`): with the pactl backend, the
+        processes of a batch run at the same time, so moving many stream_connections takes about as long as moving one.
+        """
+        moves = []  # list of (stream_connection, failure)
         for stream_connection in stream_connections:
-            failure = \
-                ([failure for failure in self.failed_stream_connections if
-                  failure.stream_connection_id == stream_connection.id] + [
-                     None])[0]
+            failure = self.failed_stream_connections.get(stream_connection.id)
             if failure is not None and not failure.try_again():
                 continue
+            moves.append((stream_connection, failure))
+
+        for batch_start in range(0, len(moves), self.max_move_batch_size):
+            self.move_batch(moves[batch_start:batch_start + self.max_move_batch_size], stream)
 
-            arguments = ['pactl', self.get_move_stream_connection_command(), str(stream_connection.id), stream.name]
+        return len(moves)
+
+    def move_batch(self, moves, stream):
+        arguments_list = [
+            ['pactl', self.get_move_stream_connection_command(), str(stream_connection.id), stream.name]
+            for stream_connection, _ in moves
+        ]
+        for arguments in arguments_list:
             log.w("move {}".format(" ".join(arguments)))
-            return_code, stdout, stderr = pactl_interface.utlis.run(arguments, assert_success=False)
-
-            if return_code != 0:
-                if failure is None:
-                    failure = self.Failure(stream_connection.id)
-                    self.failed_stream_connections.append(failure)
-                else:
-                    failure.add_attempt()
-
-                log.e('\'{}\' (client_name: {}) failed (count: {}), stderr:\n{}'.format(
-                    " ".join(arguments),
-                    stream_connection.client_name,
-                    failure.failure_count,
-                    stderr))
-                self.output_logger.log_all()
 
-    def get_default_stream_name(self):
-        arguments = ['pactl', 'info']
-        return_code, stdout, stderr = pactl_interface.utlis.run(arguments, assert_success=True)
+        with metrics.Timer('stream_move_batch_seconds', {'type': self.get_stream_type_name()}), \
+                tracing.Span('move {} {}(s)'.format(len(moves), self.get_stream_connection_facility()), 'move',
+                             {'ids': [stream_connection.id for stream_connection, _ in moves], 'to': stream.name}):
+            results = pactl_interface.utlis.run_batch(arguments_list, assert_success=False)
+
+        for (stream_connection, failure), arguments, (return_code, stdout, stderr) in zip(moves, arguments_list,
+                                                                                         results):
+            metrics.increment('stream_moves_total', {'type': self.get_stream_type_name(),
+                                                     'result': 'success' if return_code == 0 else 'failure'})
+            if return_code == 0:
+                continue
 
-        info_lines = stdout.split('\n')[:-1]
+            if failure is None:
+                failure = self.Failure(stream_connection.id)
+                self.failed_stream_connections[stream_connection.id] = failure
+            else:
+                failure.add_attempt()
+
+            log.e('\'{}\' (client_name: {}) failed (count: {}), stderr:\n{}'.format(
+                " ".join(arguments),
+                stream_connection.client_name,
+                failure.failure_count,
+                stderr))
+            self.output_logger.log_all()
+
+    def handle_event(self, event):
+        """
+        Called for every `pactl_interface.Event` while subscribed (see `AudioSwitcher.subscribe()`).
+        Moves new stream_connections to the vr stream.
+        """
+        if event.type != 'new':
+            return
 
-        for line in info_lines:
-            if self.stream_type == self.StreamType.sink:
-                regex = '^Default Sink: (.*)'
-            elif self.stream_type == self.StreamType.source:
-                regex = '^Default Source: (.*)'
+        if event.facility == self.get_stream_type_name():
+            # the vr stream might have just (re)appeared
+            vr_stream = self.find_matching_stream(self.get_all_streams(), self.get_vr_stream_regex(), "vr")
+            if vr_stream is not None:
+                self.vr_stream = vr_stream
+                self.set_stream_for_all_stream_connections(self.vr_stream)
 
-            matches = re.match(regex, line)
-            if matches is not None:
-                return matches.group(1)
+        elif event.facility == self.get_stream_connection_facility():
+            if self.vr_stream is None:
+                # e.g. the vr stream did not appear yet, it gets all stream_connections once it does (see above)
+                log.d('No vr {} to move {} {} to'.format(self.get_stream_type_name(),
+                                                        self.get_stream_connection_facility(), event.index))
+                return
+
+            if self.config.dry_run():
+                log.w('Skipping because of dry run')
+                return
+
+            stream_connections = [
+                stream_connection for stream_connection in self.get_all_stream_connections()
+                if stream_connection.id == event.index
+            ]
+            stream_connections = self.filter_by_client_name(stream_connections)
+
+            self.move_stream_connections(stream_connections, self.vr_stream)
+
+    def get_default_stream_name(self):
+        server_info = self.state.get_server_info()
+
+        if self.stream_type == self.StreamType.sink:
+            default_stream_name = server_info.get('Default Sink')
+        elif self.stream_type == self.StreamType.source:
+            default_stream_name = server_info.get('Default Source')
+        else:
+            raise NotImplementedError()
+
+        if default_stream_name is not None:
+            return default_stream_name
 
         raise RuntimeError('Unable to determine the default {stream_type}. '
                            'Workaround: Fill out the "normal_{stream_type}_regex" field in the config file.\n\n'
                            'Output of `pactl info`:\n{pactl_info}'.format(
             stream_type=self.get_stream_type_name(),
-            pactl_info=stdout
+            pactl_info='\n'.join('{}: {}'.format(key, value) for key, value in server_info.items())
         ))
 
     def filter_by_client_name(self, stream_connections):
@@ -185,19 +280,10 @@ class StreamSwitcher:
         Removes some `stream_connections` if their client_name is excluded based on the config.
         """
 
-        excluded_clients_regexes = self.config.audio_excluded_clients_regexes()
-
         new_stream_connections = []
 
         for stream_input in stream_connections:
-            is_excluded = False
-            for excluded_client_regex in excluded_clients_regexes:
-                if stream_input.client_name is not None and \
-                        re.match(excluded_client_regex, stream_input.client_name):
-                    is_excluded = True
-                    break
-
-            if not is_excluded:
+            if stream_input.client_name is None or not self.config.audio_client_excluded(stream_input.client_name):
                 new_stream_connections.append(stream_input)
 
         return new_stream_connections
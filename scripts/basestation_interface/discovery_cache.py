@@ -0,0 +1,62 @@
+import os
+import time
+
+import yaml
+
+import log
+
+
+class DiscoveryCache:
+    """
+    Remembers the Base Stations found by a Bluetooth scan in a file, to skip the scan next time.
+    Entries older than `ttl` seconds are ignored.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self, ignore_ttl=False):
+        """
+        Returns a dict of address -> name of the cached Base Stations, or None if there is no valid cache.
+        With `ignore_ttl`, an expired cache is returned as well.
+        """
+        if (self.ttl <= 0 and not ignore_ttl) or not os.path.isfile(self.path):
+            return None
+
+        try:
+            with open(self.path, 'r') as cache_file:
+                data = yaml.safe_load(cache_file)
+
+            if data['time'] + self.ttl < time.time() and not ignore_ttl:
+                log.d('Base Station discovery cache expired')
+                return None
+
+            devices = {basestation['address']: basestation['name'] for basestation in data['basestations']}
+        except (OSError, yaml.YAMLError, KeyError, TypeError) as e:
+            log.w('Ignoring invalid Base Station discovery cache {}: {}'.format(self.path, e))
+            return None
+
+        if len(devices) == 0:
+            return None
+        return devices
+
+    def save(self, devices):
+        if self.ttl <= 0:
+            return
+
+        data = {
+            'time': time.time(),
+            'basestations': [{'address': address, 'name': name} for address, name in devices.items()],
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w') as cache_file:
+                yaml.safe_dump(data, cache_file)
+        except OSError as e:
+            log.w('Failed to write Base Station discovery cache {}: {}'.format(self.path, e))
+
+    def clear(self):
+        if os.path.isfile(self.path):
+            os.unlink(self.path)
@@ -32,7 +32,9 @@ from bluepy import btle
 # standard imports
 import signal
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from struct import pack
 from functools import partial
 
@@ -152,12 +154,73 @@ def wait(psleep, verb=0):
 def hndl_io(mac, hndl, cmd, try_count, try_pause, verb, interface):
     """Write `cmd` command to the `hndl` characteristics and read the reply to/from
     BTLE device with `mac` MAC address."""
+    if mac in keepalives:
+        return keepalives[mac].io(hndl, cmd)
     lh = btle.Peripheral()
     connect(lh, mac, try_count, try_pause, verb, interface)
     resw, resr = writeReadCmd(lh, hndl, cmd, verb)
-    disconnect(lh, verb=args.verbose)
+    disconnect(lh, verb)
     return resw, resr
 
+class Keepalive:
+    """Connection to one LH which is kept open between pings and only
+    re-established after it was lost."""
+
+    def __init__(self, mac, try_count, try_pause, verb=0, interface=0, read_back=True):
+        self.mac = mac
+        self.try_count = try_count
+        self.try_pause = try_pause
+        self.verb = verb
+        self.interface = interface
+        self.read_back = read_back
+        self.lh = None
+        # pings run in worker threads, shutdown() might be called by a signal handler in the main thread
+        self.lock = threading.Lock()
+
+    def io(self, hndl, cmd):
+        """Write `cmd` to the `hndl` characteristics (and read it back if `read_back`)."""
+        with self.lock:
+            while True:
+                new_connection = self.lh is None
+                if new_connection:
+                    lh = btle.Peripheral()
+                    connect(lh, self.mac, self.try_count, self.try_pause, self.verb, self.interface)
+                    self.lh = lh
+                try:
+                    if self.read_back:
+                        return writeReadCmd(self.lh, hndl, cmd, self.verb)
+                    return writeCmd(self.lh, hndl, cmd, self.verb), None
+                except btle.BTLEDisconnectError as e:
+                    # the connection was lost since the last ping, reconnect once
+                    if (self.verb >= INFO):
+                        print(e)
+                    self.lh = None
+                    if new_connection:
+                        raise e
+
+    def close(self):
+        with self.lock:
+            if self.lh is not None:
+                try:
+                    disconnect(self.lh, self.verb)
+                except btle.BTLEException:
+                    pass
+                self.lh = None
+
+# MAC -> Keepalive of each LH (only with option "--keep_connection")
+keepalives = {}
+
+def keepaliveSetup(args):
+    for mac in [args.lh_b_mac, args.lh_c_mac if args.lh_c_id else None]:
+        if mac:
+            keepalives[mac] = Keepalive(mac, args.try_count, args.try_pause, args.verbose, args.interface,
+                                        not args.no_read_back)
+
+def keepaliveClose():
+    for keepalive in keepalives.values():
+        keepalive.close()
+    keepalives.clear()
+
 def loop(args):
     """Run the whole loop."""
     ping_b = makeUpCmd(args.lh_b_id_int, args.lh_timeout, args.cmd2)
@@ -170,11 +233,23 @@ def loop(args):
         print('Booting up "B" lighthouse')
         if args.lh_c_id:
             print('Booting up "C" lighthouse')
+    pings = [(args.lh_b_mac, ping_b)]
+    if args.lh_c_id:
+        pings.append((args.lh_c_mac, ping_c))
+
+    # with kept connections, B and C are pinged at the same time
+    executor = ThreadPoolExecutor(max_workers=len(pings)) if args.keep_connection else None
     try:
         while True:
-            hndl_io(args.lh_b_mac, args.hndl, ping_b, args.try_count, args.try_pause, args.verbose, args.interface)
-            if args.lh_c_id:
-                hndl_io(args.lh_c_mac, args.hndl, ping_c, args.try_count, args.try_pause, args.verbose, args.interface)
+            if executor is not None:
+                futures = [executor.submit(hndl_io, mac, args.hndl, ping, args.try_count, args.try_pause,
+                                           args.verbose, args.interface)
+                           for mac, ping in pings]
+                for future in futures:
+                    future.result()
+            else:
+                for mac, ping in pings:
+                    hndl_io(mac, args.hndl, ping, args.try_count, args.try_pause, args.verbose, args.interface)
             wait(args.ping_sleep, verb=args.verbose)
             now = time.monotonic()
             if args.global_timeout and (now - start > args.global_timeout):
@@ -183,6 +258,9 @@ def loop(args):
         print()
         print('Keyboard interrupt caught')
         pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 def shutdown(args):
     """Shut down the lighthouses."""
@@ -203,6 +281,7 @@ def sigterm_hndlr(args, sigterm_def, signum, frame):
         print()
         print(f'Signal {repr(signum)} caught.')
     shutdown(args)
+    keepaliveClose()
     if sigterm_def != signal.SIG_DFL:
         sigterm_def(signum, frame)
     else:
@@ -212,8 +291,11 @@ def main(args):
     """Main runner."""
     signal.signal(signal.SIGTERM, partial(sigterm_hndlr, args, signal.getsignal(signal.SIGTERM)))
     signal.signal(signal.SIGHUP, partial(sigterm_hndlr, args, signal.getsignal(signal.SIGHUP)))
+    if args.keep_connection:
+        keepaliveSetup(args)
     loop(args)
     shutdown(args)
+    keepaliveClose()
 
 #   main
 #-------------------------------------------------------------------------------
@@ -234,6 +316,8 @@ if __name__ == '__main__':
     ap.add_argument('--try_count', type=int, default=TRY_COUNT, help='number of tries to set up a connection [%(default)s]')
     ap.add_argument('--try_pause', type=int, default=TRY_PAUSE, help='sleep time when reconnecting [%(default)s]')
     ap.add_argument('--cmd2', type=int, default=CMD_HDR2, help='second byte in the data written to the LH [%(default)s]')
+    ap.add_argument('-k', '--keep_connection', action='store_true', help='keep the connection to each lighthouse open between pings and ping them concurrently')
+    ap.add_argument('--no_read_back', action='store_true', help='do not read the characteristic back after writing it')
     ap.add_argument('-v', '--verbose', action='count', default=0, help='increase verbosity of the log to stdout')
 
     args = ap.parse_args()
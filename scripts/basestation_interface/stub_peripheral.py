@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class StubPeripheral:
+    """
+    Replacement for `bluepy.btle.Peripheral` which does not need a Bluetooth device.
+    Can be passed to `V2BasestationInterface` to test it without Base Stations.
+    """
+
+    connect_time = 0.0  # seconds each connection takes
+    failures = {}  # address -> number of connection attempts to this address which will fail
+    written = {}  # address -> list of (handle, value), every write to any StubPeripheral
+    lock = threading.Lock()
+
+    def __init__(self, iface=0):
+        self.iface = iface
+        self.address = None
+
+    def connect(self, address, addrType=None, iface=None):
+        time.sleep(self.connect_time)
+
+        with self.lock:
+            if self.failures.get(address, 0) > 0:
+                self.failures[address] -= 1
+                raise RuntimeError('Stub connection to {} failed'.format(address))
+
+        self.address = address
+
+    def writeCharacteristic(self, handle, value, withResponse=False):
+        if self.address is None:
+            raise RuntimeError('Not connected')
+
+        with self.lock:
+            self.written.setdefault(self.address, []).append((handle, value))
+
+    def disconnect(self):
+        self.address = None
@@ -0,0 +1,98 @@
+import threading
+
+import log
+import metrics
+import tracing
+
+from . import lhctrl
+
+
+class V1Driver:
+    """
+    Keeps V1 Base Stations turned on by pinging them from a thread (like the loop of lhctrl.py) until `stop()` is
+    called, then turns them off.
+    """
+
+    def __init__(self, lighthouses, lh_timeout, ping_sleep, try_count, try_pause, interface=0, keep_connection=True,
+                 read_back=True):
+        self.lighthouses = [(int(lh_id, 16), mac) for lh_id, mac in lighthouses]  # list of (id, mac)
+        self.lh_timeout = lh_timeout
+        self.ping_sleep = ping_sleep
+        self.try_count = try_count
+        self.try_pause = try_pause
+        self.interface = interface
+
+        self.keepalives = {}  # mac -> lhctrl.Keepalive
+        if keep_connection:
+            for _, mac in self.lighthouses:
+                self.keepalives[mac] = lhctrl.Keepalive(mac, try_count, try_pause, interface=interface,
+                                                        read_back=read_back)
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        # not a daemon thread (which it would be by default when started by the Orchestrator), the process has to keep
+        # running to keep the Base Stations on
+        self.thread = threading.Thread(target=self.run, name='V1Driver', daemon=False)
+        self.thread.start()
+        return self
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def request_stop(self):
+        """
+        Makes the thread turn off the Base Stations and end, without waiting for it (can be used in a signal handler).
+        """
+        self.stop_event.set()
+
+    def stop(self):
+        self.request_stop()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def ping(self, mac, cmd):
+        log.d('V1Driver pinging {}'.format(mac))
+        try:
+            with metrics.Timer('basestation_ping_seconds'), tracing.Span('ping', 'basestation', {'device': mac}):
+                if mac in self.keepalives:
+                    self.keepalives[mac].io(lhctrl.HCHAR, cmd)
+                else:
+                    lhctrl.hndl_io(mac, lhctrl.HCHAR, cmd, self.try_count, self.try_pause, 0, self.interface)
+            metrics.increment('basestation_pings_total', {'result': 'success'})
+        except Exception as e:
+            metrics.increment('basestation_pings_total', {'result': 'failure'})
+            log.e('V1Driver failed to ping {}: {}'.format(mac, e))
+
+    def ping_all(self, off_timeout):
+        """
+        Tells every Base Station to turn off after `off_timeout` seconds without another ping.
+        """
+        pings = [(mac, lhctrl.makeUpCmd(lh_id, off_timeout)) for lh_id, mac in self.lighthouses]
+        if len(self.keepalives) == 0:
+            for mac, cmd in pings:
+                self.ping(mac, cmd)
+            return
+
+        # with kept connections, all Base Stations are pinged at the same time
+        # (plain threads, a ThreadPoolExecutor no longer accepts work once the main thread has ended)
+        threads = [threading.Thread(target=self.ping, args=ping, daemon=False) for ping in pings]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run(self):
+        log.i('V1Driver turning on Base Stations')
+        while not self.stop_event.is_set():
+            self.ping_all(self.lh_timeout)
+            self.stop_event.wait(self.ping_sleep)
+
+        log.i('V1Driver turning off Base Stations')
+        self.ping_all(1)
+
+        for keepalive in self.keepalives.values():
+            keepalive.close()
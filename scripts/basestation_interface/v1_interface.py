@@ -1,12 +1,11 @@
 import os
 import signal
-import subprocess
-import sys
 
 import log
-import psutil
+import process_watcher
 
 from .interface import BasestationInterface
+from .v1_driver import V1Driver
 
 
 class V1BasestationInterface(BasestationInterface):
@@ -14,43 +13,109 @@ class V1BasestationInterface(BasestationInterface):
     def __init__(self, config):
         super().__init__(config)
 
-        # File from: https://github.com/risa2000/lhctrl
-        self.lhctrl_path = os.path.realpath(os.path.join(os.path.dirname(__file__), 'lhctrl.py'))
+        # Contains the pid and the start time (see get_start_time()) of the process running self.driver, an OFF action
+        # of another process signals it
+        self.pid_path = os.path.realpath(os.path.join(os.path.dirname(__file__), '..', '..', 'cache', 'v1_driver.pid'))
 
-        self.process = None
+        self.driver = None
+        # registered here, signal handlers can only be set by the main thread (action() might run in any thread)
+        self.previous_sigint_handler = signal.signal(signal.SIGINT, self.handle_sigint)
 
     def action(self, action):
         if action == BasestationInterface.Action.ON:
-            if self.process is not None:
-                raise NotImplementedError()
-
-            arguments = [
-                sys.executable,  # Current Python interpreter
-                self.lhctrl_path,
-                '--lh_b_id', self.config.basestation_id('b'),
-                '--lh_b_mac', self.config.basestation_mac_address('b'),
-                '--lh_c_id', self.config.basestation_id('c'),
-                '--lh_c_mac', self.config.basestation_mac_address('c'),
-                '--lh_timeout', str(30),
-                '--ping_sleep', str(5),
-                '--try_count', str(self.config.basestation_attempt_count_set()),
-                '--try_pause', str(1),
-                '--interface', str(self.config.basestation_bluetooth_interface()),
-            ]
-
-            log.i("Starting lhctrl: {}".format(arguments))
-
-            self.process = subprocess.Popen(arguments)
+            if self.driver is not None and self.driver.is_running():
+                log.i('V1Driver is already running')
+                return
+
+            self.driver = V1Driver(
+                lighthouses=[
+                    (self.config.basestation_id('b'), self.config.basestation_mac_address('b')),
+                    (self.config.basestation_id('c'), self.config.basestation_mac_address('c')),
+                ],
+                lh_timeout=30,
+                ping_sleep=5,
+                try_count=self.config.basestation_attempt_count_set(),
+                try_pause=1,
+                interface=self.config.basestation_bluetooth_interface(),
+                keep_connection=self.config.basestation_keep_connection(),
+                read_back=self.config.basestation_read_back(),
+            )
+
+            log.i('Starting V1Driver')
+            self.driver.start()
+            self.write_pid()
         elif action == BasestationInterface.Action.OFF:
-            log.i('Terminating all instances of lhctrl')
-            lhctrl_processes = []
-            for process in psutil.process_iter():
-                cmd_line = process.cmdline()
-                if len(cmd_line) >= 2 and cmd_line[1] == self.lhctrl_path:
-                    lhctrl_processes.append(process)
-
-            log.d('Found {} instances of lhctrl'.format(len(lhctrl_processes)))
-            for process in lhctrl_processes:
-                process.send_signal(signal.SIGINT)
+            if self.driver is not None:
+                log.i('Stopping V1Driver')
+                self.driver.stop()
+                self.driver = None
+                self.remove_pid()
+            else:
+                self.signal_other_process()
         else:
             raise NotImplementedError()
+
+    def handle_sigint(self, signum, frame):
+        if self.driver is not None and self.driver.is_running():
+            log.i('SIGINT received, stopping V1Driver')
+            self.driver.request_stop()
+            self.remove_pid()
+        elif callable(self.previous_sigint_handler):
+            self.previous_sigint_handler(signum, frame)
+        else:
+            raise KeyboardInterrupt()
+
+    @staticmethod
+    def get_start_time(pid):
+        """
+        Returns the start time of the process `pid` (None if it does not exist), which differs for a process which
+        reused the pid.
+        """
+        return process_watcher.get_start_time(process_watcher.read_stat(pid))
+
+    def write_pid(self):
+        os.makedirs(os.path.dirname(self.pid_path), exist_ok=True)
+        with open(self.pid_path, 'w') as pid_file:
+            pid_file.write('{} {}\n'.format(os.getpid(), self.get_start_time(os.getpid())))
+
+    def read_pid(self):
+        """
+        Returns the pid and the start time from the pid file, raises OSError or ValueError if there is no valid one.
+        """
+        with open(self.pid_path, 'r') as pid_file:
+            pid, start_time = pid_file.read().split()
+        return int(pid), int(start_time)
+
+    def remove_pid(self):
+        try:
+            if self.read_pid()[0] != os.getpid():
+                return  # written by a V1Driver started later by another process
+            os.unlink(self.pid_path)
+        except (OSError, ValueError):
+            pass
+
+    def signal_other_process(self):
+        try:
+            pid, start_time = self.read_pid()
+        except (OSError, ValueError):
+            log.i('No V1Driver is running')
+            return
+
+        if self.get_start_time(pid) != start_time:
+            # the process ended without removing the file, the pid might be used by an unrelated process by now
+            log.w('Process {} of V1Driver no longer exists'.format(pid))
+            self.remove_stale_pid()
+            return
+
+        log.i('Stopping V1Driver of process {}'.format(pid))
+        try:
+            os.kill(pid, signal.SIGINT)
+        except ProcessLookupError:
+            log.w('Process {} of V1Driver no longer exists'.format(pid))
+            self.remove_stale_pid()
+
+    def remove_stale_pid(self):
+        try:
+            os.unlink(self.pid_path)
+        except OSError:
+            pass
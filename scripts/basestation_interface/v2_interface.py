@@ -1,10 +1,15 @@
+import concurrent.futures
+import threading
 import time
 
 # sudo apt install python3-pip libglib2.0-dev
 # sudo pip3 install bluepy
 import bluepy
 import log
+import metrics
+import tracing
 
+from .discovery_cache import DiscoveryCache
 from .interface import BasestationInterface
 
 
@@ -13,18 +18,51 @@ from .interface import BasestationInterface
 
 class V2BasestationInterface(BasestationInterface):
 
-    def __init__(self, config):
+    def __init__(self, config, peripheral_class=None):
         super().__init__(config)
 
+        # bluepy.btle.Peripheral or a replacement like StubPeripheral (see benchmark/basestations.py)
+        self.peripheral_class = peripheral_class if peripheral_class is not None else bluepy.btle.Peripheral
+
         self.devices = []
+        self.device_names = {}  # device -> name, as found by the most recent scan
+        self.results = {}  # device -> True if the power state of that device was set successfully
+
+        self.discovery_cache = DiscoveryCache(self.config.basestation_discovery_cache_path(),
+                                              self.config.basestation_discovery_cache_ttl())
+        self.devices_from_cache = False
+        self.rescan_thread = None  # started when a connection to a cached device fails (see set_attempt())
+
+    def get_expected_devices(self):
+        """
+        Returns the addresses of the Base Stations which a scan is expected to find (those found by the previous scan).
+        """
+        if len(self.device_names) > 0:
+            return set(self.device_names.keys())
+
+        cached_device_names = self.discovery_cache.load(ignore_ttl=True)
+        if cached_device_names is not None:
+            return set(cached_device_names.keys())
+
+        return set()
 
     def scan(self):
         class Delegate(bluepy.btle.DefaultDelegate):
 
-            def __init__(self):
+            def __init__(self, expected_devices, expected_count):
                 self.devices = []
+                self.device_names = {}
+                self.expected_devices = expected_devices
+                self.expected_count = expected_count
                 bluepy.btle.DefaultDelegate.__init__(self)
 
+            def is_complete(self):
+                if len(self.devices) == 0:
+                    return False
+                if self.expected_count > 0:
+                    return len(self.devices) >= self.expected_count
+                return len(self.expected_devices) > 0 and self.expected_devices.issubset(self.devices)
+
             def handleDiscovery(self, dev, is_new_dev, is_new_data):
                 if not is_new_dev:
                     return
@@ -32,20 +70,37 @@ class V2BasestationInterface(BasestationInterface):
                 manufacturer = dev.getValue(bluepy.btle.ScanEntry.MANUFACTURER)
 
                 if manufacturer is not None and manufacturer[0:4] == b'\x5d\x05\x00\x02':
-                    log.i('Found Base Station {} at address {}'.format(
-                        dev.getValue(bluepy.btle.ScanEntry.COMPLETE_LOCAL_NAME),
-                        dev.addr))
+                    name = dev.getValue(bluepy.btle.ScanEntry.COMPLETE_LOCAL_NAME)
+                    log.i('Found Base Station {} at address {}'.format(name, dev.addr))
                     self.devices.append(dev.addr)
+                    self.device_names[dev.addr] = name
+
+        expected_devices = self.get_expected_devices()
+        expected_count = self.config.basestation_expected_count()
+        log.d('Scan expects Base Stations: {}, count: {}'.format(sorted(expected_devices), expected_count))
 
-        self.devices = []
         scanner = bluepy.btle.Scanner(iface=self.config.basestation_bluetooth_interface())
-        delegate = Delegate()
+        delegate = Delegate(expected_devices, expected_count)
         scanner.withDelegate(delegate)
         try:
-            scanner.scan(
-                timeout=2,
-                passive=self.config.basestation_scan_type() == 'passive'
-            )
+            # like scanner.scan(), but stops as soon as all expected Base Stations were found
+            deadline = time.monotonic() + self.config.basestation_scan_timeout()
+            with tracing.Span('scan', 'basestation', {'expected': len(expected_devices)}) as span:
+                scanner.clear()
+                scanner.start(passive=self.config.basestation_scan_type() == 'passive')
+                try:
+                    while not delegate.is_complete():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        scanner.process(min(remaining, 0.1))
+                finally:
+                    scanner.stop()
+                span.args['found'] = len(delegate.devices)
+            scan_duration = self.config.basestation_scan_timeout() - (deadline - time.monotonic())
+            log.d('Scan took {:.2f}s'.format(scan_duration))
+            metrics.observe('basestation_scan_seconds', scan_duration)
+            metrics.set_gauge('basestation_scan_found', len(delegate.devices))
         except bluepy.btle.BTLEManagementError as e:
             log.e(e)
             if 'code: 20, error: Permission Denied' in str(e):
@@ -72,60 +127,128 @@ Original error: {}'''.format(e))
             else:
                 raise e
 
-        self.devices = delegate.devices
-        if len(self.devices) == 0:
+        # the devices of the previous scan are kept until a scan finds any (e.g. a failed rescan keeps them)
+        if len(delegate.devices) == 0:
             raise RuntimeError('Bluetooth scan found no Base Stations. '
                                'If there are powered Base Stations near you, '
                                'this is probably a problem with your Bluetooth device.')
+        self.devices = delegate.devices
+        self.device_names = delegate.device_names
 
-    def action_attempt(self, action):
+        self.devices_from_cache = False
+        self.discovery_cache.save(self.device_names)
+
+    def set_power_state(self, device, action):
         address = 0x12  # location of the byte which sets the power state
 
-        for device in self.devices:
-            basestation = bluepy.btle.Peripheral(iface=self.config.basestation_bluetooth_interface())
-            log.i('Connecting to {}'.format(device))
+        basestation = self.peripheral_class(iface=self.config.basestation_bluetooth_interface())
+        log.i('Connecting to {}'.format(device))
+        with metrics.Timer('basestation_connect_seconds'), tracing.Span('connect', 'basestation', {'device': device}):
             basestation.connect(device, addrType=bluepy.btle.ADDR_TYPE_RANDOM)
 
-            if action == self.Action.ON:
-                if not self.config.dry_run():
-                    basestation.writeCharacteristic(address, b'\x01')
-                else:
-                    log.w('Skipping because of dry run:')
-                log.i('Turning on')
-            elif action == self.Action.OFF:
-                if not self.config.dry_run():
-                    basestation.writeCharacteristic(address, b'\x00')
-                else:
-                    log.w('Skipping because of dry run:')
-                log.i('Turning off')
-
+        try:
+            with metrics.Timer('basestation_write_seconds'), tracing.Span('write', 'basestation',
+                                                                          {'device': device, 'action': action.name}):
+                if action == self.Action.ON:
+                    if not self.config.dry_run():
+                        basestation.writeCharacteristic(address, b'\x01')
+                    else:
+                        log.w('Skipping because of dry run:')
+                    log.i('Turning on {}'.format(device))
+                elif action == self.Action.OFF:
+                    if not self.config.dry_run():
+                        basestation.writeCharacteristic(address, b'\x00')
+                    else:
+                        log.w('Skipping because of dry run:')
+                    log.i('Turning off {}'.format(device))
+        finally:
             basestation.disconnect()
 
-    def action(self, action):
-        def attempt_loop(function, max_attempts, try_all=False):
-            attempt_count = 0
-            success_count = 0
-            last_error = None
-            while attempt_count < max_attempts:
+    def action_attempt(self, action):
+        if len(self.devices) == 0:
+            raise RuntimeError('No Base Stations to set the power state of')
+
+        # Base Stations which were already set successfully in a previous attempt are skipped.
+        pending_devices = [device for device in self.devices if not self.results.get(device, False)]
+
+        max_workers = len(pending_devices) if self.config.basestation_parallel_set() else 1
+        errors = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            futures = {executor.submit(self.set_power_state, device, action): device for device in pending_devices}
+            for future in concurrent.futures.as_completed(futures):
+                device = futures[future]
                 try:
-                    if try_all:
-                        function()
-                    else:
-                        return function()
-                    success_count += 1
-                    log.i('Success of attempt {} of {}'.format(attempt_count + 1, max_attempts))
+                    future.result()
+                    self.results[device] = True
+                    metrics.increment('basestation_sets_total', {'result': 'success'})
                 except Exception as e:
-                    last_error = e
-                    log.e('Failure of attempt {} of {}: {}'.format(attempt_count + 1, max_attempts, e))
-                attempt_count += 1
+                    self.results[device] = False
+                    metrics.increment('basestation_sets_total', {'result': 'failure'})
+                    errors[device] = e
+                    log.e('Failed to set power state of {}: {}'.format(device, e))
+
+        if len(errors) > 0:
+            raise RuntimeError('Failed to set power state of {} of {} Base Stations: {}'.format(
+                len(errors), len(self.devices), ', '.join(errors.keys())))
+
+    @staticmethod
+    def attempt_loop(function, max_attempts):
+        attempt_count = 0
+        last_error = None
+        while attempt_count < max_attempts:
+            try:
+                with tracing.Span('attempt {} of {}'.format(attempt_count + 1, max_attempts), 'basestation'):
+                    result = function()
+                log.i('Success of attempt {} of {}'.format(attempt_count + 1, max_attempts))
+                return result
+            except Exception as e:
+                last_error = e
+                log.e('Failure of attempt {} of {}: {}'.format(attempt_count + 1, max_attempts, e))
+            attempt_count += 1
+
+            time.sleep(0.5)  # to increase robustness
+
+        log.e('No successful attempt in any of the {} attempts. Last error:'.format(max_attempts))
+        raise last_error
+
+    def scan_loop(self):
+        self.attempt_loop(lambda: self.scan(), self.config.basestation_attempt_count_scan())
+
+    def rescan(self):
+        log.i("Scanning for Base Stations again in the background:")
+        try:
+            self.scan_loop()
+        except Exception as e:
+            log.e('Background scan failed: {}'.format(e))
 
-                time.sleep(0.5)  # to increase robustness
+    def set_attempt(self, action):
+        if self.rescan_thread is not None:
+            self.rescan_thread.join()
+            self.rescan_thread = None
 
-            if success_count == 0:
-                log.e('No successful attempt in any of the {} attempts. Last error:'.format(max_attempts))
-                raise last_error
+        try:
+            self.action_attempt(action)
+        except Exception:
+            if self.devices_from_cache:
+                # the cached addresses might be outdated, scan while waiting for the next attempt
+                self.devices_from_cache = False
+                self.discovery_cache.clear()
+                self.rescan_thread = threading.Thread(target=self.rescan, daemon=True)
+                self.rescan_thread.start()
+            raise
+
+    def action(self, action):
+        cached_device_names = self.discovery_cache.load()
+        if cached_device_names is not None:
+            log.i("Using cached Base Stations (skipping scan): {}".format(cached_device_names))
+            self.devices = list(cached_device_names.keys())
+            self.device_names = cached_device_names
+            self.devices_from_cache = True
+        else:
+            log.i("Scanning for Base Stations:")
+            self.scan_loop()
 
-        log.i("Scanning for Base Stations:")
-        attempt_loop(lambda: self.scan(), self.config.basestation_attempt_count_scan())
         log.i("Changing power state of Base Stations:")
-        attempt_loop(lambda: self.action_attempt(action), self.config.basestation_attempt_count_set(), try_all=True)
+        self.results = {}
+        # Each attempt only retries the Base Stations which failed in previous attempts.
+        self.attempt_loop(lambda: self.set_attempt(action), self.config.basestation_attempt_count_set())
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+
+# Usage (from the scripts directory): python3 -m benchmark.basestations [--stations 4] [--connect-time 1.5]
+#
+# Measures how long V2BasestationInterface takes to turn on Base Stations, one after another and in parallel, without
+# Bluetooth hardware (bluepy has to be installed): every connection is made by a StubPeripheral, and the scan is
+# skipped by a discovery cache which contains the stub addresses.
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import yaml
+
+from basestation_interface import V2BasestationInterface
+from basestation_interface.discovery_cache import DiscoveryCache
+from basestation_interface.stub_peripheral import StubPeripheral
+from config import Config
+
+
+def create_config(directory, parallel_set):
+    config_path = os.path.join(directory, 'config_{}.yaml'.format('parallel' if parallel_set else 'sequential'))
+    with open(config_path, 'w') as config_file:
+        yaml.safe_dump({
+            'log': {'enabled': False},
+            'basestation': {
+                'enabled': True,
+                'type': 'v2',
+                'parallel_set': parallel_set,
+                'discovery_cache_path': os.path.join(directory, 'basestations.yaml'),
+            },
+        }, config_file)
+    return Config(config_path=config_path)
+
+
+def measure_action(config, addresses):
+    """
+    Returns the number of seconds turning on all Base Stations took.
+    """
+    DiscoveryCache(config.basestation_discovery_cache_path(), config.basestation_discovery_cache_ttl()).save(
+        {address: 'LHB-{:08X}'.format(index) for index, address in enumerate(addresses)})
+    StubPeripheral.written = {}
+
+    start = time.perf_counter()
+    V2BasestationInterface(config, peripheral_class=StubPeripheral).action(V2BasestationInterface.Action.ON)
+    seconds = time.perf_counter() - start
+
+    if sorted(StubPeripheral.written.keys()) != sorted(addresses):
+        raise RuntimeError('Not all Base Stations were turned on: {}'.format(StubPeripheral.written))
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stations', type=int, default=4, help='Number of Base Stations.')
+    parser.add_argument('--connect-time', type=float, default=1.5,
+                        help='Number of seconds every connection to a Base Station takes.')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # e.g. every connection is logged
+
+    StubPeripheral.connect_time = args.connect_time
+    addresses = ['f0:00:00:00:00:{:02x}'.format(index) for index in range(args.stations)]
+
+    directory = tempfile.mkdtemp(prefix='basestations_')
+    try:
+        # (a failed connection to a cached Base Station would start a scan, so all connections succeed)
+        print('{:>12} {:>10}'.format('mode', 's'))
+        for parallel_set in [False, True]:
+            seconds = measure_action(create_config(directory, parallel_set), addresses)
+            print('{:>12} {:>10.2f}'.format('parallel' if parallel_set else 'sequential', seconds))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+
+# Usage (from the scripts directory): python3 -m benchmark.card_parser
+
+import argparse
+import time
+
+import pactl_interface
+
+
+def generate_cards(card_count, port_count, profiles_per_port=4):
+    """
+    Returns synthetic output of `pactl list cards`, similar to a GPU exposing many HDMI/DP outputs.
+    """
+    lines = []
+    for card_index in range(card_count):
+        profile_count = port_count * profiles_per_port
+        lines += [
+            'Card #{}'.format(card_index),
+            '\tName: alsa_card.pci-0000_{:02x}_00.1'.format(card_index),
+            '\tDriver: module-alsa-card.c',
+            '\tOwner Module: {}'.format(card_index + 7),
+            '\tProperties:',
+            '\t\talsa.card = "{}"'.format(card_index),
+            '\t\tdevice.product.name = "GPU {}"'.format(card_index),
+            '\tProfiles:',
+        ]
+        lines += [
+            '\t\toutput:hdmi-stereo-extra{}: Digital Stereo (HDMI {}) Output '
+            '(sinks: 1, sources: 0, priority: 5900, available: yes)'.format(profile_index, profile_index)
+            for profile_index in range(profile_count)
+        ]
+        lines += [
+            '\t\toff: Off (sinks: 0, sources: 0, priority: 0, available: yes)',
+            '\tActive Profile: off',
+            '\tPorts:',
+        ]
+        for port_index in range(port_count):
+            lines += [
+                '\t\thdmi-output-{}: HDMI / DisplayPort {} (type: HDMI, priority: 5900, latency offset: 0 usec, '
+                'available)'.format(port_index, port_index),
+                '\t\t\tProperties:',
+                '\t\t\t\tdevice.icon_name = "video-display"',
+                '\t\t\t\tdevice.product.name = "{}"'.format('Index HMD' if port_index == port_count - 1 else
+                                                            'Monitor {}'.format(port_index)),
+                '\t\t\tPart of profile(s): {}'.format(', '.join(
+                    'output:hdmi-stereo-extra{}'.format(port_index * profiles_per_port + offset)
+                    for offset in range(profiles_per_port)
+                )),
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+def measure(function, repetitions):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cards', type=int, default=4, help='Number of cards.')
+    parser.add_argument('--repetitions', type=int, default=5, help='Number of measurements per size.')
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>12} {:>14}'.format('ports', 'lines', 'seconds', 'us per line'))
+    for port_count in [8, 16, 32, 64, 128, 256, 512]:
+        output = generate_cards(args.cards, port_count)
+        line_count = output.count('\n')
+
+        seconds = measure(
+            lambda: pactl_interface.Card.parse_cards(pactl_interface.Card.cleanup_pactl_output(output)),
+            args.repetitions)
+
+        print('{:>8} {:>10} {:>12.6f} {:>14.3f}'.format(port_count, line_count, seconds, seconds / line_count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+
+# Stand-in for `pactl`, used by benchmark/ticks.py. The audio server it pretends to talk to is described by a scenario
+# file (see benchmark/scenario.yaml), configured by these environment variables:
+# - FAKE_PACTL_SCENARIO: path of the scenario file (YAML, or JSON if it ends with .json, which starts faster)
+# - FAKE_PACTL_STATE: path of a file which stores the changes made by commands (e.g. moved sink inputs)
+# - FAKE_PACTL_LOG: path of a file to which every call is appended (one line each), used to count calls
+
+import fcntl
+import json
+import os
+import sys
+import time
+
+# run as a script, the scripts directory is not on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Scenario:
+    def __init__(self, data):
+        self.latency = float(data.get('latency', 0))
+        self.sinks = int(data.get('sinks', 2))
+        self.sources = int(data.get('sources', 2))
+        self.cards = int(data.get('cards', 1))
+        self.ports_per_card = int(data.get('ports_per_card', 4))
+        self.profiles_per_port = int(data.get('profiles_per_port', 4))
+        self.sink_inputs = int(data.get('sink_inputs', 0))
+        self.source_outputs = int(data.get('source_outputs', 0))
+        self.clients = max(int(data.get('clients', 1)), 1)
+
+    @classmethod
+    def load(cls, path):
+        # imports are done only when needed, every call starts a new process
+        with open(path, 'r') as scenario_file:
+            if path.endswith('.json'):
+                return cls(json.load(scenario_file))
+
+            import yaml
+            return cls(yaml.safe_load(scenario_file) or {})
+
+    @staticmethod
+    def sink_name(index):
+        # sink 0 is the normal sink, sink 1 the sink of the HMD
+        if index == 0:
+            return 'alsa_output.pci-0000_00_1f.3.analog-stereo'
+        if index == 1:
+            return 'alsa_output.pci-0000_00_00.1.hdmi-stereo-extra3'
+        return 'alsa_output.usb-Generic_Headset_{}-00.iec958-stereo'.format(index)
+
+    @staticmethod
+    def source_name(index):
+        # source 0 is the normal source, source 1 the microphone of the HMD
+        if index == 0:
+            return 'alsa_input.pci-0000_00_1f.3.analog-stereo'
+        if index == 1:
+            return 'alsa_input.usb-Valve_Corporation_Valve_VR_Radio___HMD_Mic-01.mono-fallback'
+        return 'alsa_input.usb-Generic_Headset_{}-00.iec958-stereo'.format(index)
+
+    @staticmethod
+    def client_name(index):
+        return 'application-{}'.format(index)
+
+    def initial_state(self):
+        # every stream connection starts at the normal stream
+        return {
+            'sink_inputs': {str(index): 0 for index in range(self.sink_inputs)},
+            'source_outputs': {str(index): 0 for index in range(self.source_outputs)},
+        }
+
+
+class StateFile:
+    """
+    State shared by all calls, locked while a call reads or changes it (some calls run concurrently).
+    """
+
+    def __init__(self, path, scenario):
+        self.path = path
+        self.scenario = scenario
+        self.file = None
+        self.data = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'a+')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        self.file.seek(0)
+        content = self.file.read()
+        self.data = json.loads(content) if len(content) > 0 else self.scenario.initial_state()
+        return self
+
+    def save(self):
+        self.file.seek(0)
+        self.file.truncate()
+        json.dump(self.data, self.file)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()  # writes buffered changes before the lock is released
+
+
+def short_sinks(scenario):
+    return ''.join('{}\t{}\tmodule-alsa-card.c\ts16le 2ch 44100Hz\tRUNNING\n'.format(index, scenario.sink_name(index))
+                   for index in range(scenario.sinks))
+
+
+def short_sources(scenario):
+    return ''.join('{}\t{}\tmodule-alsa-card.c\ts16le 2ch 44100Hz\tRUNNING\n'.format(index, scenario.source_name(index))
+                   for index in range(scenario.sources))
+
+
+def short_stream_connections(scenario, stream_ids):
+    return ''.join('{}\t{}\t{}\tprotocol-native.c\tfloat32le 2ch 48000Hz\n'.format(
+        index, stream_ids[str(index)], index % scenario.clients) for index in range(len(stream_ids)))
+
+
+def short_clients(scenario):
+    return ''.join('{}\tprotocol-native.c\t{}\n'.format(index, scenario.client_name(index))
+                   for index in range(scenario.clients))
+
+
+def short_cards(scenario):
+    return ''.join('{}\talsa_card.pci-0000_{:02x}_00.1\tmodule-alsa-card.c\n'.format(index, index)
+                   for index in range(scenario.cards))
+
+
+def info(scenario):
+    return ('Server String: /run/user/1000/pulse/native\n'
+            'Server Name: pulseaudio\n'
+            'Server Version: 14.2\n'
+            'Default Sink: {}\n'
+            'Default Source: {}\n').format(scenario.sink_name(0), scenario.source_name(0))
+
+
+def long_streams(scenario, section, count, stream_name):
+    lines = []
+    for index in range(count):
+        lines += ['{} #{}'.format(section, index), '\tState: RUNNING', '\tName: {}'.format(stream_name(index)),
+                  '\tDriver: module-alsa-card.c', '\tMute: no', '']
+    return lines
+
+
+def long_properties(name, index):
+    return ['\tProperties:', '\t\tapplication.name = "{}"'.format(name),
+            '\t\tapplication.process.binary = "{}"'.format(name), '\t\tapplication.process.id = "{}"'.format(index),
+            '\t\tmedia.name = "Playback"']
+
+
+def long_stream_connections(scenario, section, key, stream_ids):
+    lines = []
+    for index in range(len(stream_ids)):
+        client = index % scenario.clients
+        lines += ['{} #{}'.format(section, index), '\tDriver: protocol-native.c',
+                  '\tClient: {}'.format(client), '\t{}: {}'.format(key, stream_ids[str(index)])]
+        lines += long_properties(scenario.client_name(client), client) + ['']
+    return lines
+
+
+def long_clients(scenario):
+    lines = []
+    for index in range(scenario.clients):
+        lines += ['Client #{}'.format(index), '\tDriver: protocol-native.c']
+        lines += long_properties(scenario.client_name(index), index) + ['']
+    return lines
+
+
+def long_list(scenario, state, list_type):
+    """
+    Returns the output of `pactl list <list_type>`, or of `pactl list` (without cards) if `list_type` is None.
+    """
+    lines_by_type = {
+        'sinks': lambda: long_streams(scenario, 'Sink', scenario.sinks, scenario.sink_name),
+        'sources': lambda: long_streams(scenario, 'Source', scenario.sources, scenario.source_name),
+        'sink-inputs': lambda: long_stream_connections(scenario, 'Sink Input', 'Sink', state['sink_inputs']),
+        'source-outputs': lambda: long_stream_connections(scenario, 'Source Output', 'Source',
+                                                          state['source_outputs']),
+        'clients': lambda: long_clients(scenario),
+    }
+    list_types = [list_type] if list_type is not None else list(lines_by_type.keys())
+    return '\n'.join(line for list_type in list_types for line in lines_by_type[list_type]()) + '\n'
+
+
+def move(state_file, key, stream_count, stream_names, arguments):
+    if len(arguments) != 2:
+        return 1, '', 'Failure: Invalid argument\n'
+    stream_connection_id, stream_name = arguments
+
+    stream_ids = state_file.data[key]
+    streams = [index for index in range(stream_count) if stream_names(index) == stream_name]
+    if stream_connection_id not in stream_ids or len(streams) == 0:
+        return 1, '', 'Failure: No such entity\n'
+
+    stream_ids[stream_connection_id] = streams[0]
+    state_file.save()
+    return 0, '', ''
+
+
+def run(scenario, state_path, arguments):
+    """
+    Returns `(return_code, stdout, stderr)` of `pactl <arguments>`.
+    """
+    command = ' '.join(arguments)
+    with StateFile(state_path, scenario) as state_file:
+        state = state_file.data
+
+        if command == 'info':
+            return 0, info(scenario), ''
+        if command == 'list':
+            return 0, long_list(scenario, state, None), ''
+        if arguments[:1] == ['list'] and len(arguments) == 2 and arguments[1] in ['sinks', 'sources', 'sink-inputs',
+                                                                                  'source-outputs', 'clients']:
+            return 0, long_list(scenario, state, arguments[1]), ''
+        if command == 'list short':
+            return 0, (short_sinks(scenario) + short_sources(scenario)
+                       + short_stream_connections(scenario, state['sink_inputs'])
+                       + short_stream_connections(scenario, state['source_outputs'])
+                       + short_clients(scenario) + short_cards(scenario)), ''
+        if command == 'list short sinks':
+            return 0, short_sinks(scenario), ''
+        if command == 'list short sources':
+            return 0, short_sources(scenario), ''
+        if command == 'list short sink-inputs':
+            return 0, short_stream_connections(scenario, state['sink_inputs']), ''
+        if command == 'list short source-outputs':
+            return 0, short_stream_connections(scenario, state['source_outputs']), ''
+        if command == 'list short clients':
+            return 0, short_clients(scenario), ''
+        if command == 'list short cards':
+            return 0, short_cards(scenario), ''
+        if command == 'list cards':
+            from benchmark.card_parser import generate_cards
+            return 0, generate_cards(scenario.cards, scenario.ports_per_card, scenario.profiles_per_port), ''
+
+        if arguments[:1] == ['move-sink-input']:
+            return move(state_file, 'sink_inputs', scenario.sinks, scenario.sink_name, arguments[1:])
+        if arguments[:1] == ['move-source-output']:
+            return move(state_file, 'source_outputs', scenario.sources, scenario.source_name,
+                        arguments[1:])
+        if arguments[:1] in [['suspend-sink'], ['set-card-profile']]:
+            return 0, '', ''
+        if command == 'load-module module-detect':
+            return 0, '{}\n'.format(scenario.cards + 20), ''
+
+    return 1, '', 'Fake pactl does not support: {}\n'.format(command)
+
+
+def main():
+    arguments = sys.argv[1:]
+
+    log_path = os.environ.get('FAKE_PACTL_LOG')
+    if log_path is not None:
+        with open(log_path, 'a') as log_file:
+            log_file.write(' '.join(arguments) + '\n')
+
+    scenario = Scenario.load(os.environ['FAKE_PACTL_SCENARIO'])
+    time.sleep(scenario.latency)
+
+    return_code, stdout, stderr = run(scenario, os.environ['FAKE_PACTL_STATE'], arguments)
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    sys.exit(return_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+# Usage (from the scripts directory): python3 -m benchmark.process_watcher
+
+import argparse
+import os
+import subprocess
+
+import process_watcher
+from benchmark.card_parser import measure
+
+
+def start_processes(count):
+    """
+    Starts `count` idle processes (blocked reading stdin) to simulate a machine with many processes.
+    """
+    return [
+        subprocess.Popen(['cat'], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=2000,
+                        help='Number of additional processes to start (to reach thousands of processes).')
+    parser.add_argument('--repetitions', type=int, default=20, help='Number of measurements per method.')
+    args = parser.parse_args()
+
+    processes = start_processes(args.processes)
+    watched = subprocess.Popen(['sleep', '600'])
+    try:
+        process_count = len([entry for entry in os.listdir('/proc') if entry.isdigit()])
+        print('processes: {}'.format(process_count))
+
+        scanner = process_watcher.ProcScanner('sleep')
+        missing_scanner = process_watcher.ProcScanner('vrcompositor')
+        methods = [
+            ('ps -C (running)', lambda: subprocess.run(['ps', '-C', 'sleep'], capture_output=True)),
+            ('ps -C (not running)', lambda: subprocess.run(['ps', '-C', 'vrcompositor'], capture_output=True)),
+            ('/proc scan', lambda: process_watcher.find_pids('sleep')),
+            ('ProcScanner (running)', scanner.scan),
+            ('ProcScanner (not running)', missing_scanner.scan),
+        ]
+
+        print('{:>26} {:>14}'.format('method', 'us per check'))
+        for name, function in methods:
+            function()  # warm up (and let the scanners find the pid)
+            seconds = measure(function, args.repetitions)
+            print('{:>26} {:>14.1f}'.format(name, seconds * 1e6))
+    finally:
+        for process in processes + [watched]:
+            process.kill()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
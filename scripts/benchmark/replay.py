@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+# Usage (from the scripts directory): python3 -m benchmark.replay SESSION [--realtime]
+#
+# Measures the same operations as benchmark/ticks.py, with the responses of a session file recorded on another machine
+# (see the config value audio:record_path and `debug_dump.py --record`) instead of an audio server. The config of that
+# machine is taken from the session file.
+#
+# The lists of a session never change, so the operations marked with '(moves)' repeat the moves needed in the recorded
+# state. Sessions recorded by the daemon (audio:record_path) contain the real responses to the moves, `debug_dump.py
+# --record` records no moves (they are answered as successful by ReplayBackend).
+
+import argparse
+import logging
+import os
+import tempfile
+
+import yaml
+
+import pactl_interface
+from benchmark.ticks import create_operations
+from benchmark.ticks import print_measurements
+from config import Config
+
+
+def create_config(header):
+    """
+    Returns the recorded config, with everything except the audio component disabled.
+    """
+    data = dict(header.get('config') or {})
+    data['log'] = {'enabled': False}
+    data['basestation'] = {'enabled': False}
+    data['audio'] = dict(data.get('audio') or {}, enabled=True, record_path='')
+    data['daemon'] = dict(data.get('daemon') or {}, audio_mode='poll')
+
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as config_file:
+        yaml.safe_dump(data, config_file)
+    try:
+        return Config(config_path=config_file.name)
+    finally:
+        os.unlink(config_file.name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('session', help='Path to a session file.')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Every command takes as long as it took while recording.')
+    parser.add_argument('--repetitions', type=int, default=10, help='Number of measurements per operation.')
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # e.g. every move is logged as a warning, failed moves as errors
+
+    backend = pactl_interface.ReplayBackend(args.session, realtime=args.realtime)
+    pactl_interface.utlis.set_backend(backend)
+
+    config = create_config(backend.header)
+    print_measurements(create_operations(config, backend.rewind), lambda: backend.call_count, args.repetitions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+# Usage (from the scripts directory): python3 -m benchmark.ticks [--scenario benchmark/scenario.yaml]
+#
+# Measures the cost of the operations done by the daemon against benchmark/fake_pactl.py, which is put on the PATH as
+# `pactl`. For every operation the wall time, the number of `pactl` calls and the peak of memory allocated (traced by
+# tracemalloc in separate repetitions, tracing slows down the measured code) are reported.
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+import pactl_interface
+from audio import SinkSwitcher
+from audio.source_switcher import SourceSwitcher
+from config import Config
+from steamvr_daemon import SteamvrDaemon
+from steamvr_utils import SteamvrUtils
+
+config_content = """
+log: {enabled: false}
+basestation: {enabled: false}
+audio:
+  enabled: true
+  vr_sink_regex: '.*hdmi.*'
+  normal_sink_regex: '.*analog.*'
+  vr_source_regex: '.*Valve.*'
+  normal_source_regex: '.*analog.*'
+  set_card_port: true
+  card_port_vr_product_name_regex: 'Index HMD'
+daemon:
+  audio_mode: poll
+"""
+
+
+class FakePactl:
+    """
+    Puts a `pactl` which runs benchmark/fake_pactl.py with `scenario_path` first on the PATH, until `close()`.
+    """
+
+    def __init__(self, scenario_path):
+        self.directory = tempfile.mkdtemp(prefix='fake_pactl_')
+        self.state_path = os.path.join(self.directory, 'state.json')
+        self.log_path = os.path.join(self.directory, 'calls.log')
+        self.config_path = os.path.join(self.directory, 'config.yaml')
+        self.scenario_path = os.path.join(self.directory, 'scenario.json')
+
+        with open(scenario_path, 'r') as scenario_file, open(self.scenario_path, 'w') as json_file:
+            json.dump(yaml.safe_load(scenario_file) or {}, json_file)
+
+        with open(self.config_path, 'w') as config_file:
+            config_file.write(config_content)
+
+        executable_path = os.path.join(self.directory, 'pactl')
+        with open(executable_path, 'w') as executable_file:
+            executable_file.write('#!/bin/sh\nexec "{}" "{}" "$@"\n'.format(
+                sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_pactl.py')))
+        os.chmod(executable_path, os.stat(executable_path).st_mode | stat.S_IXUSR)
+
+        self.old_environment = {key: os.environ.get(key) for key in
+                                ['PATH', 'FAKE_PACTL_SCENARIO', 'FAKE_PACTL_STATE', 'FAKE_PACTL_LOG']}
+        os.environ['PATH'] = self.directory + os.pathsep + os.environ.get('PATH', '')
+        os.environ['FAKE_PACTL_SCENARIO'] = self.scenario_path
+        os.environ['FAKE_PACTL_STATE'] = self.state_path
+        os.environ['FAKE_PACTL_LOG'] = self.log_path
+
+    def reset(self):
+        """
+        Undoes all changes (e.g. moved sink inputs) made by previous calls.
+        """
+        if os.path.isfile(self.state_path):
+            os.unlink(self.state_path)
+
+    def call_count(self):
+        if not os.path.isfile(self.log_path):
+            return 0
+        with open(self.log_path, 'r') as log_file:
+            return sum(1 for _ in log_file)
+
+    def close(self):
+        for key, value in self.old_environment.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.directory)
+
+
+class Operation:
+    """
+    `function` is measured, `setup` (not measured) runs before every repetition.
+    """
+
+    def __init__(self, name, function, setup=None):
+        self.name = name
+        self.function = function
+        self.setup = setup
+
+
+def measure_operation(operation, call_count, repetitions):
+    """
+    Returns the average (seconds, pactl calls, peak KiB) of one execution of `operation`. `call_count()` returns the
+    number of pactl calls made so far.
+    """
+    seconds = 0
+    calls = 0
+    for _ in range(repetitions):
+        if operation.setup is not None:
+            operation.setup()
+        calls_before = call_count()
+        start = time.perf_counter()
+        operation.function()
+        seconds += time.perf_counter() - start
+        calls += call_count() - calls_before
+
+    peak_bytes = 0
+    for _ in range(repetitions):
+        if operation.setup is not None:
+            operation.setup()
+        tracemalloc.start()
+        operation.function()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_bytes += peak
+
+    return seconds / repetitions, calls / repetitions, peak_bytes / repetitions / 1024
+
+
+def create_operations(config, reset):
+    """
+    `reset()` undoes all changes made on the audio server, operations marked with '(moves)' start after it.
+    """
+    sink_switcher = SinkSwitcher(config)
+    source_switcher = SourceSwitcher(config)
+
+    def reset_switcher(switcher):
+        reset()
+        switcher.state.invalidate()
+        switcher.failed_stream_connections.clear()
+
+    steamvr_utils = SteamvrUtils(config)
+    steamvr_daemon = SteamvrDaemon(steamvr_utils)
+    # pretend SteamVR is running, without starting the ProcessWatcher
+    steamvr_daemon.process_watcher.pids = {os.getpid()}
+    steamvr_daemon.current_stage = SteamvrDaemon.Stages.BEFORE_STEAMVR
+    steamvr_daemon.check()
+
+    def reset_daemon():
+        reset()
+        steamvr_daemon.audio_interval.reset()
+
+    return [
+        # the cost of a single call (e.g. starting the fake pactl) is included in every call of the other operations
+        Operation('pactl info (one call)', lambda: pactl_interface.utlis.run(['pactl', 'info'], assert_success=False)),
+        Operation('Card.get_all_cards', pactl_interface.Card.get_all_cards),
+        Operation('SinkSwitcher.switch_to_vr (moves)', sink_switcher.switch_to_vr,
+                  setup=lambda: reset_switcher(sink_switcher)),
+        Operation('SinkSwitcher.switch_to_vr (unchanged)', sink_switcher.switch_to_vr,
+                  setup=sink_switcher.state.invalidate),
+        Operation('SourceSwitcher.switch_to_vr (moves)', source_switcher.switch_to_vr,
+                  setup=lambda: reset_switcher(source_switcher)),
+        Operation('SourceSwitcher.switch_to_vr (unchanged)', source_switcher.switch_to_vr,
+                  setup=source_switcher.state.invalidate),
+        Operation('SteamvrDaemon.check', steamvr_daemon.check),
+        Operation('SteamvrDaemon.audio_task (moves)', steamvr_daemon.audio_task, setup=reset_daemon),
+        Operation('SteamvrDaemon.audio_task (unchanged)', steamvr_daemon.audio_task),
+    ]
+
+
+def print_measurements(operations, call_count, repetitions):
+    print('{:>40} {:>10} {:>12} {:>10}'.format('operation', 'ms', 'pactl calls', 'peak KiB'))
+    for operation in operations:
+        operation.function()  # warm up
+        seconds, calls, peak_kib = measure_operation(operation, call_count, repetitions)
+        print('{:>40} {:>10.2f} {:>12.1f} {:>10.1f}'.format(operation.name, seconds * 1e3, calls, peak_kib))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenario', default=os.path.join(os.path.dirname(__file__), 'scenario.yaml'),
+                        help='Path to a scenario file (see benchmark/scenario.yaml).')
+    parser.add_argument('--repetitions', type=int, default=10, help='Number of measurements per operation.')
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # e.g. every move is logged as a warning, failed moves as errors
+
+    fake_pactl = FakePactl(args.scenario)
+    try:
+        config = Config(config_path=fake_pactl.config_path)
+        print_measurements(create_operations(config, fake_pactl.reset), fake_pactl.call_count, args.repetitions)
+    finally:
+        fake_pactl.close()
+
+
+if __name__ == '__main__':
+    main()
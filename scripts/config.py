@@ -2,6 +2,7 @@
 
 import datetime
 import os
+import re
 
 import yaml
 
@@ -25,6 +26,18 @@ class Config:
         with open(config_path, 'r') as config_file:
             self.data = yaml.load(config_file, Loader=yaml.Loader)
 
+        self.compiled_regexes = {}  # regex -> compiled regex (see compiled_regex())
+        self.excluded_clients_matcher = None  # see audio_client_excluded()
+        self.excluded_clients = {}  # client name -> bool (see audio_client_excluded())
+
+    def compiled_regex(self, regex):
+        """
+        Returns the compiled `regex`, every regex is only compiled once.
+        """
+        if regex not in self.compiled_regexes:
+            self.compiled_regexes[regex] = re.compile(regex)
+        return self.compiled_regexes[regex]
+
     def log_path(self):
         if 'log' in self.data and 'enabled' in self.data['log'] and not self.data['log']['enabled']:
             return None
@@ -80,12 +93,61 @@ class Config:
 
         return 'active'
 
+    def basestation_scan_timeout(self):
+        if 'basestation' in self.data and 'scan_timeout' in self.data['basestation']:
+            return float(self.data['basestation']['scan_timeout'])
+
+        return 2.0
+
+    def basestation_expected_count(self):
+        if 'basestation' in self.data and 'expected_count' in self.data['basestation']:
+            return int(self.data['basestation']['expected_count'])
+
+        return 0
+
     def basestation_attempt_count_set(self):
         if 'basestation' in self.data and 'attempt_count_set' in self.data['basestation']:
             return int(self.data['basestation']['attempt_count_set'])
 
         return 5
 
+    def basestation_discovery_cache_ttl(self):
+        if 'basestation' in self.data and 'discovery_cache_ttl' in self.data['basestation']:
+            return float(self.data['basestation']['discovery_cache_ttl'])
+
+        return 7 * 24 * 60 * 60
+
+    def basestation_discovery_cache_path(self):
+        if 'basestation' in self.data and 'discovery_cache_path' in self.data['basestation']:
+            return self.data['basestation']['discovery_cache_path']
+
+        return os.path.join(os.path.dirname(__file__), '..', 'cache', 'basestations.yaml')
+
+    def basestation_parallel_set(self):
+        if 'basestation' in self.data and 'parallel_set' in self.data['basestation']:
+            return bool(self.data['basestation']['parallel_set'])
+
+        return True
+
+    def basestation_timeout(self):
+        if 'basestation' in self.data and 'timeout' in self.data['basestation']:
+            timeout = float(self.data['basestation']['timeout'])
+            return timeout if timeout > 0 else None
+
+        return 60.0
+
+    def basestation_keep_connection(self):
+        if 'basestation' in self.data and 'keep_connection' in self.data['basestation']:
+            return bool(self.data['basestation']['keep_connection'])
+
+        return True
+
+    def basestation_read_back(self):
+        if 'basestation' in self.data and 'read_back' in self.data['basestation']:
+            return bool(self.data['basestation']['read_back'])
+
+        return True
+
     def basestation_mac_address(self, mode):
         if mode not in ['b', 'c']:
             raise RuntimeError()
@@ -130,6 +192,24 @@ class Config:
 
         return False
 
+    def audio_backend(self):
+        if 'audio' in self.data and 'backend' in self.data['audio']:
+            audio_backend = self.data['audio']['backend']
+            valid_backends = ['pactl', 'native']
+            if audio_backend not in valid_backends:
+                raise RuntimeError('Invalid value for audio:backend, valid options: {}'.format(valid_backends))
+            return audio_backend
+
+        return 'pactl'
+
+    def audio_record_path(self):
+        if 'audio' in self.data and 'record_path' in self.data['audio']:
+            record_path = self.data['audio']['record_path']
+            if record_path:
+                return os.path.abspath(os.path.expanduser(str(record_path)))
+
+        return None
+
     def audio_change_sink(self):
         if 'audio' in self.data and 'change_sink' in self.data['audio']:
             return bool(self.data['audio']['change_sink'])
@@ -172,6 +252,33 @@ class Config:
 
         return []
 
+    def audio_client_excluded(self, client_name):
+        """
+        Returns True if `client_name` is matched by any of audio:excluded_clients_regexes.
+        The result is remembered for every client name.
+        """
+        if client_name in self.excluded_clients:
+            return self.excluded_clients[client_name]
+
+        if self.excluded_clients_matcher is None:
+            excluded_clients_regexes = self.audio_excluded_clients_regexes()
+            separate_regexes = [self.compiled_regex(regex) for regex in excluded_clients_regexes]
+            if any(regex.groups > 0 for regex in separate_regexes):
+                # combined, the groups would be renumbered (a backreference like \1 would refer to another group)
+                self.excluded_clients_matcher = separate_regexes
+            else:
+                try:
+                    # one alternation is faster than trying every regex
+                    combined_regex = re.compile('|'.join('(?:{})'.format(regex) for regex in excluded_clients_regexes))
+                    self.excluded_clients_matcher = [combined_regex] if len(excluded_clients_regexes) > 0 else []
+                except re.error:
+                    # e.g. global flags like (?i) are only allowed at the start of a regex
+                    self.excluded_clients_matcher = separate_regexes
+
+        is_excluded = any(regex.match(client_name) for regex in self.excluded_clients_matcher)
+        self.excluded_clients[client_name] = is_excluded
+        return is_excluded
+
     def audio_set_card_port(self):
         if 'audio' in self.data and 'set_card_port' in self.data['audio']:
             return bool(self.data['audio']['set_card_port'])
@@ -201,18 +308,94 @@ class Config:
 
         return 10.0
 
+    def audio_timeout(self):
+        if 'audio' in self.data and 'timeout' in self.data['audio']:
+            timeout = float(self.data['audio']['timeout'])
+            return timeout if timeout > 0 else None
+
+        return 30.0
+
     def daemon_watch_process_name(self):
         if 'daemon' in self.data and 'watch_process_name' in self.data['daemon']:
             return self.data['daemon']['watch_process_name']
 
         return 'vrcompositor'
 
+    def daemon_process_watch_method(self):
+        if 'daemon' in self.data and 'process_watch_method' in self.data['daemon']:
+            daemon_process_watch_method = self.data['daemon']['process_watch_method']
+            valid_methods = ['auto', 'netlink', 'pidfd', 'proc']
+            if daemon_process_watch_method not in valid_methods:
+                raise RuntimeError(
+                    'Invalid value for daemon:process_watch_method, valid options: {}'.format(valid_methods))
+            return daemon_process_watch_method
+
+        return 'auto'
+
+    def daemon_check_interval(self):
+        if 'daemon' in self.data and 'check_interval' in self.data['daemon']:
+            return float(self.data['daemon']['check_interval'])
+
+        return 1.0
+
+    def daemon_check_interval_max(self):
+        if 'daemon' in self.data and 'check_interval_max' in self.data['daemon']:
+            return float(self.data['daemon']['check_interval_max'])
+
+        return 10.0
+
+    def daemon_audio_interval(self):
+        if 'daemon' in self.data and 'audio_interval' in self.data['daemon']:
+            return float(self.data['daemon']['audio_interval'])
+
+        return 1.0
+
+    def daemon_audio_interval_max(self):
+        if 'daemon' in self.data and 'audio_interval_max' in self.data['daemon']:
+            return float(self.data['daemon']['audio_interval_max'])
+
+        return 5.0
+
     def daemon_wait_after_quit(self):
         if 'daemon' in self.data and 'wait_after_quit' in self.data['daemon']:
             return self.data['daemon']['wait_after_quit']
 
         return 40
 
+    def daemon_audio_mode(self):
+        if 'daemon' in self.data and 'audio_mode' in self.data['daemon']:
+            daemon_audio_mode = self.data['daemon']['audio_mode']
+            valid_modes = ['poll', 'subscribe']
+            if daemon_audio_mode not in valid_modes:
+                raise RuntimeError('Invalid value for daemon:audio_mode, valid options: {}'.format(valid_modes))
+            return daemon_audio_mode
+
+        return 'poll'
+
+    def daemon_metrics_textfile(self):
+        if 'daemon' in self.data and 'metrics_textfile' in self.data['daemon']:
+            metrics_textfile = self.data['daemon']['metrics_textfile']
+            if metrics_textfile:
+                # the daemon changes its working directory
+                return os.path.abspath(os.path.expanduser(str(metrics_textfile)))
+
+        return None
+
+    def daemon_metrics_socket(self):
+        if 'daemon' in self.data and 'metrics_socket' in self.data['daemon']:
+            metrics_socket = self.data['daemon']['metrics_socket']
+            if metrics_socket:
+                # the daemon changes its working directory
+                return os.path.abspath(os.path.expanduser(str(metrics_socket)))
+
+        return None
+
+    def daemon_metrics_interval(self):
+        if 'daemon' in self.data and 'metrics_interval' in self.data['daemon']:
+            return float(self.data['daemon']['metrics_interval'])
+
+        return 10.0
+
     def dry_run(self):
         if self.dry_run_overwrite:
             return True
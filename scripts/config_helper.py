@@ -24,7 +24,9 @@ class ConfigHelper:
 
         '''
 
-        sinks = pactl_interface.Sink.get_all_sinks()
+        snapshot = pactl_interface.snapshot()
+
+        sinks = snapshot.sinks
 
         sink_names = [
             sink.name
@@ -47,7 +49,7 @@ class ConfigHelper:
             '\n'.join(sink_names)
         )
 
-        sources = pactl_interface.Source.get_all_sources()
+        sources = snapshot.sources
 
         source_names = [
             source.name
@@ -93,7 +95,7 @@ class ConfigHelper:
             '\n'.join(card_port_product_names)
         )
 
-        clients = pactl_interface.Client.get_all_clients()
+        clients = snapshot.clients
         client_names = [client.client_name for client in clients]
 
         help_text += '''
@@ -12,12 +12,20 @@ def debug_dump():
     parser.add_argument('--config',
                         default=None,
                         help='Path to a config file.')
+    parser.add_argument('--record',
+                        default=None,
+                        help='Path of a session file to which all commands and their output are written '
+                             '(can be replayed by benchmark/replay.py).')
     args = parser.parse_args()
 
     config = Config(config_path=args.config)
 
     log.initialise(config)
 
+    if args.record is not None:
+        pactl_interface.utlis.set_backend(pactl_interface.RecordingBackend(
+            pactl_interface.utlis.get_backend(), args.record, header={'config': config.data}))
+
     log.i("debug_dump start")
 
     log.i("config:\n{}".format(config.data))
@@ -29,7 +37,15 @@ def debug_dump():
         ['pactl', 'list', 'short', 'sink-inputs'],
         ['pactl', 'list', 'short', 'source-outputs'],
         ['pactl', 'list', 'short', 'clients'],
+        ['pactl', 'list', 'short', 'cards'],
+        ['pactl', 'list', 'short'],
         ['pactl', 'list', 'cards'],
+        # used by pactl_interface.snapshot()
+        ['pactl', 'list', 'sinks'],
+        ['pactl', 'list', 'sources'],
+        ['pactl', 'list', 'sink-inputs'],
+        ['pactl', 'list', 'source-outputs'],
+        ['pactl', 'list', 'clients'],
     ]
 
     for command in commands:
@@ -40,6 +56,8 @@ def debug_dump():
 
         ))
 
+    pactl_interface.utlis.get_backend().close()
+
     log.i("debug_dump end")
 
 
@@ -9,7 +9,7 @@ e = logging.error
 
 
 def initialise(config):
-    log_formatter = logging.Formatter('%(asctime)19.19s [%(levelname)-5.5s]: %(message)s')
+    log_formatter = logging.Formatter('%(asctime)23.23s [%(levelname)-5.5s]: %(message)s')  # with milliseconds
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG)
 
@@ -0,0 +1,228 @@
+import bisect
+import os
+import socket
+import stat
+import threading
+import time
+
+import log
+
+# Counters, gauges and latency histograms collected by all components of this process, exposed in the Prometheus text
+# format (see `render()`) by the daemon (see `write_textfile()` and `SocketServer`).
+
+prefix = 'steamvr_utils_'
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
+
+
+class Histogram:
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets  # upper bounds
+        self.bucket_counts = [0] * len(buckets)  # not cumulative, see render()
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> Histogram
+
+
+def get_key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def increment(name, labels=None, amount=1):
+    key = get_key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name, value, labels=None):
+    key = get_key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, seconds, labels=None):
+    key = get_key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+class Timer:
+    """
+    Context manager which observes the number of seconds its body took in the histogram `name`.
+    """
+
+    def __init__(self, name, labels=None):
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        observe(self.name, time.perf_counter() - self.start, self.labels)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def format_labels(labels, extra_label=None):
+    labels = list(labels) + ([extra_label] if extra_label is not None else [])
+    if len(labels) == 0:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                          for key, value in labels) + '}'
+
+
+def format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, (histogram.buckets, list(histogram.bucket_counts), histogram.sum, histogram.count))
+                            for key, histogram in _histograms.items())
+
+    lines = []
+    typed_names = set()
+
+    def add_type(name, metric_type):
+        if name not in typed_names:
+            typed_names.add(name)
+            lines.append('# TYPE {}{} {}'.format(prefix, name, metric_type))
+
+    for metric_type, values in [('counter', counters), ('gauge', gauges)]:
+        for (name, labels), value in values:
+            add_type(name, metric_type)
+            lines.append('{}{}{} {}'.format(prefix, name, format_labels(labels), format_number(value)))
+
+    for (name, labels), (buckets, bucket_counts, histogram_sum, count) in histograms:
+        add_type(name, 'histogram')
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(buckets, bucket_counts):
+            cumulative_count += bucket_count
+            lines.append('{}{}_bucket{} {}'.format(prefix, name, format_labels(labels, ('le', upper_bound)),
+                                                   cumulative_count))
+        lines.append('{}{}_bucket{} {}'.format(prefix, name, format_labels(labels, ('le', '+Inf')), count))
+        lines.append('{}{}_sum{} {}'.format(prefix, name, format_labels(labels), format_number(histogram_sum)))
+        lines.append('{}{}_count{} {}'.format(prefix, name, format_labels(labels), count))
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path):
+    """
+    Writes all metrics to `path` (e.g. for the textfile collector of the Prometheus node exporter), readers never see a
+    partially written file.
+    """
+    temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary_path, 'w') as metrics_file:
+        metrics_file.write(render())
+    os.replace(temporary_path, path)
+
+
+class SocketServer:
+    """
+    Answers every connection to the Unix socket at `path` with an HTTP response containing all metrics (the request is
+    ignored), e.g. for `curl --unix-socket <path> http://localhost/metrics`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.server_socket = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.remove_stale_socket()
+
+        self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server_socket.bind(self.path)
+        self.server_socket.listen()
+        self.server_socket.settimeout(0.5)  # to notice stop()
+
+        log.i('Metrics are served at: {}'.format(self.path))
+        self.thread = threading.Thread(target=self.serve, name='MetricsServer', daemon=True)
+        self.thread.start()
+        return self
+
+    def remove_stale_socket(self):
+        """
+        Removes a socket left over from a previous daemon at `self.path`. Anything else at that path (e.g. a regular file
+        or the socket of a running daemon) is kept and raises a RuntimeError.
+        """
+        try:
+            mode = os.lstat(self.path).st_mode
+        except FileNotFoundError:
+            return
+
+        if not stat.S_ISSOCK(mode):
+            raise RuntimeError('Metrics socket path exists and is not a socket: {}'.format(self.path))
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as test_socket:
+            try:
+                test_socket.connect(self.path)
+            except ConnectionRefusedError:
+                log.d('Removing stale metrics socket: {}'.format(self.path))
+                os.unlink(self.path)
+                return
+
+        raise RuntimeError('Metrics socket is used by another process: {}'.format(self.path))
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.server_socket.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.server_socket.accept()
+            except socket.timeout:
+                continue
+            except OSError as e:
+                log.e('Metrics server failed: {}'.format(e))
+                return
+
+            try:
+                with connection:
+                    connection.settimeout(0.1)
+                    try:
+                        connection.recv(4096)  # e.g. an HTTP request
+                    except socket.timeout:
+                        pass
+                    body = render().encode()
+                    connection.sendall(b'HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                                       + 'Content-Length: {}\r\n\r\n'.format(len(body)).encode() + body)
+            except OSError as e:
+                log.d('Metrics client failed: {}'.format(e))
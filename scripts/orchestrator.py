@@ -0,0 +1,97 @@
+import asyncio
+import collections
+import threading
+import time
+
+import log
+import metrics
+import tracing
+
+
+class Orchestrator:
+    """
+    Runs the components of a transition (e.g. turning the Base Stations on, switching the sink and switching the
+    source) at the same time, each in its own thread and with its own timeout.
+    A component which timed out keeps running in the background, but `run()` no longer waits for it.
+    """
+
+    Result = collections.namedtuple('Result', ['name', 'success', 'duration', 'error'])
+
+    def __init__(self, name):
+        self.name = name
+        self.components = []  # list of (name, function, timeout)
+
+    def add(self, name, function, timeout=None):
+        self.components.append((name, function, timeout))
+        return self
+
+    @staticmethod
+    async def run_in_thread(name, function):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_future(result, error):
+            if future.done():
+                return  # timed out
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def target():
+            result, error = None, None
+            try:
+                with tracing.Span(name, 'component'):
+                    result = function()
+            except Exception as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(set_future, result, error)
+            except RuntimeError:
+                log.w('{} finished after the timeout, error: {}'.format(name, error))  # the loop is already closed
+
+        # daemon thread: a component which timed out must not prevent the process from exiting
+        threading.Thread(target=target, name=name, daemon=True).start()
+        return await future
+
+    async def run_component(self, name, function, timeout):
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self.run_in_thread(name, function), timeout)
+            return self.Result(name, True, time.monotonic() - start, None)
+        except asyncio.TimeoutError:
+            error = TimeoutError('{} did not finish within {}s'.format(name, timeout))
+            log.e(str(error))
+            return self.Result(name, False, time.monotonic() - start, error)
+        except Exception as e:
+            log.e('{} failed:'.format(name), exc_info=e)
+            return self.Result(name, False, time.monotonic() - start, e)
+
+    async def run_all(self):
+        return await asyncio.gather(*[
+            self.run_component(name, function, timeout) for name, function, timeout in self.components
+        ])
+
+    def run(self):
+        """
+        Returns a list of `Result`, one for each component. Raises a RuntimeError if any component failed.
+        """
+        start = time.monotonic()
+        results = asyncio.run(self.run_all())
+
+        for result in results:
+            log.d('{} {}: {} after {:.2f}s'.format(self.name, result.name, 'done' if result.success else 'failed',
+                                                   result.duration))
+            metrics.observe('transition_component_seconds', result.duration,
+                            {'transition': self.name, 'component': result.name,
+                             'result': 'success' if result.success else 'failure'})
+        duration = time.monotonic() - start
+        log.i('{} took {:.2f}s'.format(self.name, duration))
+        metrics.observe('transition_seconds', duration, {'transition': self.name})
+
+        failures = [result for result in results if not result.success]
+        if len(failures) > 0:
+            raise RuntimeError('{} failed for: {}'.format(
+                self.name, ', '.join('{} ({})'.format(result.name, result.error) for result in failures)))
+
+        return results
@@ -1,8 +1,16 @@
 from . import utlis
+from .backend import create_backend
 from .card import Card
+from .card_cache import CardCache
 from .client import Client
 from .client import Client
+from .session_backend import RecordingBackend
+from .session_backend import ReplayBackend
 from .sink import Sink
 from .sink_input import SinkInput
 from .source import Source
+from .snapshot import Snapshot
+from .snapshot import snapshot
 from .source_output import SourceOutput
+from .state import State
+from .subscription import Event
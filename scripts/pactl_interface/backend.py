@@ -0,0 +1,98 @@
+import os
+import subprocess
+
+import log
+
+from .subscription import PactlSubscription
+
+
+class Backend:
+    """
+    Executes `pactl` commands. `run()` takes the same arguments as a `pactl` invocation and returns
+    `(return_code, stdout, stderr)` as `pactl` would.
+    """
+
+    def run(self, arguments):
+        raise NotImplementedError()
+
+    def run_batch(self, arguments_list):
+        """
+        Executes multiple independent commands, returns a list with one `(return_code, stdout, stderr)` per command.
+        """
+        return [self.run(arguments) for arguments in arguments_list]
+
+    def subscribe(self, callback):
+        """
+        Returns a started `Subscription` which calls `callback` for every change on the audio server.
+        """
+        return PactlSubscription(callback).start()
+
+    def close(self):
+        pass
+
+
+class SubprocessBackend(Backend):
+    """
+    Starts a new `pactl` process for every command.
+    """
+
+    @staticmethod
+    def get_environment():
+        environment = dict(os.environ)
+        environment['LC_ALL'] = 'C'  # https://github.com/DavidRisch/steamvr_utils/issues/2
+        return environment
+
+    def run(self, arguments):
+        process = subprocess.run(arguments, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 env=self.get_environment())
+
+        return process.returncode, process.stdout.decode(), process.stderr.decode()
+
+    def run_batch(self, arguments_list):
+        # start all processes before waiting for any of them
+        environment = self.get_environment()
+        processes = []
+        try:
+            for arguments in arguments_list:
+                processes.append(subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                                  env=environment))
+        except BaseException:
+            # e.g. too many open files, the processes started so far must not be left running
+            for process in processes:
+                process.kill()
+                process.communicate()
+            raise
+
+        results = []
+        for process in processes:
+            stdout, stderr = process.communicate()
+            results.append((process.returncode, stdout.decode(), stderr.decode()))
+        return results
+
+
+def create_backend(config):
+    backend = create_audio_server_backend(config)
+
+    record_path = config.audio_record_path()
+    if record_path is not None:
+        from .session_backend import RecordingBackend
+        return RecordingBackend(backend, record_path, header={'config': config.data})
+
+    return backend
+
+
+def create_audio_server_backend(config):
+    backend_name = config.audio_backend()
+
+    if backend_name == 'pactl':
+        return SubprocessBackend()
+    elif backend_name == 'native':
+        try:
+            from .native_backend import NativeBackend
+        except ModuleNotFoundError as e:
+            log.w('Falling back to the pactl backend, the native backend requires \'pulsectl\': {}'.format(e))
+            return SubprocessBackend()
+
+        return NativeBackend(fallback=SubprocessBackend())
+    else:
+        raise NotImplementedError()
@@ -1,6 +1,8 @@
 import re
 
 import log
+import metrics
+import tracing
 
 from . import utlis
 
@@ -20,76 +22,57 @@ class Card:
             return '<PROFILE name: {}, human_name: {}>'.format(self.name, self.human_name)
 
     class Port:
-        def __init__(self, in_dict, card):
+        def __init__(self, line, card):
             self.product_name = None
             self.profiles = []
+            self.profile_names = []  # resolved to self.profiles once all profiles of the card are known
             self.card = card
 
-            if isinstance(in_dict, str):
-                key, contents = in_dict, []
-            else:
-                key, contents = list(in_dict.items())[0]
-
-            match = re.match('^(.*): ', key)
-            self.name = match.group(1)
-
-            for content in contents:
-                if 'Properties:' in content:
-                    for property_item in content['Properties:']:
-                        if isinstance(property_item, dict):
-                            property_item, _ = list(property_item.items())[0]
-                        match = re.match('^device.product.name = \"(.*)\"$', property_item)
-                        if match is not None:
-                            self.product_name = match.group(1)
+            match = re.match('^(.*): ', line)
+            self.name = match.group(1) if match is not None else line
+
+        def parse_content(self, line):
+            match = re.match(r'^Part of profile\(s\): (.*)$', line)
+            if match is not None:
+                self.profile_names += match.group(1).split(', ')
+
+        def parse_property(self, line):
+            match = re.match('^device.product.name = \"(.*)\"$', line)
+            if match is not None:
+                self.product_name = match.group(1)
+
+        def resolve_profiles(self, profiles_by_name):
+            for profile_name in self.profile_names:
+                if profile_name in profiles_by_name:
+                    self.profiles.append(profiles_by_name[profile_name])
                 else:
-                    match = re.match(r'^Part of profile\(s\): (.*)$', content)
-                    if match is not None:
-                        profile_names = match.group(1).split(', ')
-                        for profile_name in profile_names:
-                            matching_profiles = [
-                                profile for profile in card.profiles
-                                if profile.name == profile_name
-                            ]
-                            if len(matching_profiles) == 1:
-                                self.profiles.append(matching_profiles[0])
-                            else:
-                                log.w('Did not find profile {}'.format(profile_name))
+                    log.w('Did not find profile {}'.format(profile_name))
 
         def __eq__(self, other):
             if isinstance(other, type(self)):
-                return self.card == self.card and self.name == other.name
+                return self.card == other.card and self.name == other.name
             return False
 
         def __repr__(self):
             return '<PORT name: {}, product_name: {}, profiles: {}>'.format(
                 self.name, self.product_name, self.profiles)
 
-    def __init__(self, in_dict):
+    def __init__(self, header):
+        self.header = header  # e.g. 'Card #0'
         self.name = None
-        self.profiles = None
+        self.profiles = []
         self.ports = []
 
-        card_dict = list(in_dict.items())[0][1]
-
-        for item in card_dict:
-            if isinstance(item, str):
-                match = re.match('^Name: (.*)$', item)
-                if match is not None:
-                    self.name = match.group(1)
-
-            elif isinstance(item, dict):
-                key, content = list(item.items())[0]
-                if key == 'Profiles:':
-                    self.profiles = []
-                    for profile_dict in content:
-                        self.profiles.append(self.Profile(profile_dict))
-                if key == 'Ports:':
-                    self.ports = []
-                    for port_dict in content:
-                        self.ports.append(self.Port(port_dict, self))
-
+    def finish_parsing(self):
         if self.name is None:
-            raise RuntimeError('Parsing of card failed (no name found):\n{}'.format(in_dict))
+            raise RuntimeError('Parsing of card failed (no name found): {}'.format(self.header))
+
+        profiles_by_name = {}
+        for profile in self.profiles:
+            profiles_by_name.setdefault(profile.name, profile)
+
+        for port in self.ports:
+            port.resolve_profiles(profiles_by_name)
 
     def set_profile(self, config, profile):
         if config.dry_run():
@@ -119,58 +102,70 @@ class Card:
     def cleanup_pactl_output(cards):
         # Sometimes 'device.product.name' contains a newline which causes problems.
         # This is detected by lines beginning with a space or quote.
-        cleaned_cards = ''
-        previous_line = ''
+        cleaned_lines = []
         for line in cards.splitlines():
             if len(line) > 0:
-                if line[0] == ' ' or line[0] == '"':
-                    previous_line += line
+                if (line[0] == ' ' or line[0] == '"') and len(cleaned_lines) > 0:
+                    cleaned_lines[-1] += line
                 else:
-                    cleaned_cards += previous_line + '\n'
-                    previous_line = line
-        return cleaned_cards
+                    cleaned_lines.append(line)
+        return cleaned_lines
+
+    @classmethod
+    def parse_cards(cls, lines):
+        """
+        Parses the lines of `pactl list cards` (after `cleanup_pactl_output()`) in a single pass.
+        The nesting of the lines is tracked by their indentation.
+        """
+        cards = []
+        card = None
+        port = None
+        parents = []  # (indentation, text) of every line enclosing the current line
+
+        for line in lines:
+            text = line.strip()
+            if len(text) == 0:
+                continue
+
+            indentation = len(line) - len(line.lstrip())
+            while len(parents) > 0 and parents[-1][0] >= indentation:
+                parents.pop()
+            depth = len(parents)
+
+            if depth == 0:
+                card = cls(text)
+                cards.append(card)
+                port = None
+
+            elif depth == 1:
+                if text.startswith('Name: '):
+                    card.name = text[len('Name: '):]
+
+            elif depth == 2:
+                section = parents[1][1]
+                if section == 'Profiles:':
+                    card.profiles.append(cls.Profile(text))
+                elif section == 'Ports:':
+                    port = cls.Port(text, card)
+                    card.ports.append(port)
+
+            elif port is not None and parents[1][1] == 'Ports:':
+                if depth == 3:
+                    port.parse_content(text)
+                elif depth == 4 and parents[3][1] == 'Properties:':
+                    port.parse_property(text)
+
+            parents.append((indentation, text))
+
+        for card in cards:
+            card.finish_parsing()
+
+        return cards
 
     @classmethod
     def get_all_cards(cls):
         arguments = ['pactl', 'list', 'cards']
         return_code, stdout, stderr = utlis.run(arguments, assert_success=True)
 
-        cards = stdout
-
-        cards = cls.cleanup_pactl_output(cards)
-
-        class Node:
-            # https://stackoverflow.com/a/53346240/13623303
-            def __init__(self, indented_line):
-                self.children = []
-                self.level = len(indented_line) - len(indented_line.lstrip())
-                self.text = indented_line.strip()
-
-            def add_children(self, nodes):
-                child_level = nodes[0].level
-                while nodes:
-                    node = nodes.pop(0)
-                    if node.level == child_level:  # add node as a child
-                        self.children.append(node)
-                    elif node.level > child_level:  # add nodes as grandchildren of the last child
-                        nodes.insert(0, node)
-                        self.children[-1].add_children(nodes)
-                    elif node.level <= self.level:  # this node is a sibling, no more children
-                        nodes.insert(0, node)
-                        return
-
-            def as_dict(self):
-                if len(self.children) > 0:
-                    return {self.text: [node.as_dict() for node in self.children]}
-                else:
-                    return self.text
-
-        root = Node('root')
-        root.add_children([Node(line) for line in cards.splitlines() if line.strip()])
-
-        cards = []
-
-        for card_dict in root.as_dict()['root']:
-            cards.append(cls(card_dict))
-
-        return cards
+        with metrics.Timer('card_parse_seconds'), tracing.Span('parse cards', 'parse', {'lines': stdout.count('\n')}):
+            return cls.parse_cards(cls.cleanup_pactl_output(stdout))
@@ -0,0 +1,90 @@
+import re
+import threading
+
+from . import utlis
+from .card import Card
+
+
+class CardCache:
+    """
+    Cache of the parsed output of `pactl list cards` and of the ports found by `find_port()`.
+
+    The cache is dropped by `invalidate()` (e.g. after any card event, including changes of the active profile or port,
+    see `State.handle_event()`). After `check()`, a fingerprint of the cards is compared to its previous value on the
+    next access, which is much cheaper than parsing all cards again. After a lookup which found no port, the cards are
+    parsed again on the next access, because the port might appear at any time.
+    """
+
+    def __init__(self):
+        self.cards = None
+        self.cards_of_last_miss = []  # cards searched by the most recent find_port() which returned None
+        self.ports_by_regex = {}
+        self.fingerprint = None
+        self.needs_check = False
+        self.lock = threading.RLock()
+
+    def invalidate(self):
+        with self.lock:
+            self.cards = None
+            self.ports_by_regex = {}
+
+    def check(self):
+        with self.lock:
+            self.needs_check = True
+
+    @staticmethod
+    def get_fingerprint():
+        """
+        Returns the short list of cards and the names of all sinks and sources. The short list of cards stays the same
+        when the active profile of a card changes, but the sinks and sources of a card (and their names) are created
+        by its active profile.
+        """
+        cards, sinks, sources = utlis.run_batch([
+            ['pactl', 'list', 'short', 'cards'],
+            ['pactl', 'list', 'short', 'sinks'],
+            ['pactl', 'list', 'short', 'sources'],
+        ], assert_success=True)
+        # only the names, the state of a sink or source (e.g. SUSPENDED) changes often
+        stream_names = [line.split('\t')[1] for line in (sinks[1] + sources[1]).splitlines() if '\t' in line]
+        return cards[1], stream_names
+
+    def validate(self):
+        if self.cards is not None and not self.needs_check:
+            return
+
+        fingerprint = self.get_fingerprint()
+        if fingerprint != self.fingerprint:
+            self.invalidate()
+            self.fingerprint = fingerprint
+        self.needs_check = False
+
+    def load_cards(self):
+        if self.cards is None:
+            self.cards = Card.get_all_cards()
+        return self.cards
+
+    def get_cards(self):
+        with self.lock:
+            self.validate()
+            return self.load_cards()
+
+    def find_port(self, product_name_regex):
+        """
+        Returns the first port of any card with a product name matching `product_name_regex` (string or compiled
+        regex), or None.
+        """
+        with self.lock:
+            self.validate()
+            if product_name_regex in self.ports_by_regex:
+                return self.ports_by_regex[product_name_regex]
+
+            cards = self.load_cards()
+            for card in cards:
+                for port in card.ports:
+                    if port.product_name is not None and re.match(product_name_regex, port.product_name):
+                        self.ports_by_regex[product_name_regex] = port
+                        return port
+
+            self.cards = None
+            self.cards_of_last_miss = cards
+            return None
@@ -2,9 +2,14 @@ from . import utlis
 
 
 class Client:
-    def __init__(self, line):
-        self.client_id = int(line.split('\t')[0])
-        self.client_name = line.split('\t')[2]
+    def __init__(self, client_id, client_name):
+        self.client_id = client_id
+        self.client_name = client_name
+
+    @classmethod
+    def from_short_line(cls, line):
+        fields = line.split('\t')
+        return cls(int(fields[0]), fields[2])
 
     @classmethod
     def get_all_clients(cls, output_logger=None):
@@ -16,17 +21,19 @@ class Client:
 
         client_lines = stdout.split('\n')[:-1]
 
-        clients = [cls(line) for line in client_lines]
+        clients = [cls.from_short_line(line) for line in client_lines]
         return clients
 
-    @classmethod
-    def get_client_names(cls, sink_inputs):
-        clients = cls.get_all_clients()
+    @staticmethod
+    def get_clients_by_id(clients):
+        return {client.client_id: client for client in clients}
 
-        for sink_input in sink_inputs:
-            if sink_input.client_id is None:
-                continue
-
-            matching_client = ([client for client in clients if client.client_id == sink_input.client_id] + [None])[0]
-            if matching_client is not None:
-                sink_input.client_name = matching_client.client_name
+    @classmethod
+    def get_client_names(cls, stream_connections):
+        """
+        Lets every stream connection resolve its client from the current list of clients.
+        """
+        clients_by_id = cls.get_clients_by_id(cls.get_all_clients())
+
+        for stream_connection in stream_connections:
+            stream_connection.clients_by_id = clients_by_id
@@ -0,0 +1,272 @@
+import os
+import threading
+
+# sudo pip3 install pulsectl
+import pulsectl
+
+import log
+
+from .backend import Backend
+from .subscription import Event
+from .subscription import Subscription
+
+# pulsectl uses this value for fields like `client` if they are not set (PA_INVALID_INDEX)
+INVALID_INDEX = 0xffffffff
+
+
+class NativeBackend(Backend):
+    """
+    Keeps one connection to the PulseAudio/PipeWire server open (via the native protocol of libpulse) and answers
+    the `pactl` commands used by this project with output formatted like the output of `pactl`.
+    Commands which are not implemented here are passed to the `fallback` backend.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+        self.pulse = None
+        self.pulse_pid = None  # pid of the process which opened `self.pulse` (see `connect()`)
+        self.lock = threading.Lock()
+
+        self.commands = {
+            ('info',): self.info,
+            ('list', 'short', 'sinks'): self.list_short_sinks,
+            ('list', 'short', 'sources'): self.list_short_sources,
+            ('list', 'short', 'sink-inputs'): self.list_short_sink_inputs,
+            ('list', 'short', 'source-outputs'): self.list_short_source_outputs,
+            ('list', 'short', 'clients'): self.list_short_clients,
+            ('list', 'short', 'cards'): self.list_short_cards,
+            ('list', 'short'): self.list_short_all,
+            ('list', 'sinks'): self.list_sinks,
+            ('list', 'sources'): self.list_sources,
+            ('list', 'sink-inputs'): self.list_sink_inputs,
+            ('list', 'source-outputs'): self.list_source_outputs,
+            ('list', 'clients'): self.list_clients,
+            ('list',): self.list_all,
+            # `list cards` is passed to the fallback: depending on the version of pulsectl, card ports have no
+            # properties (e.g. device.product.name, used to find the port of the HMD) or profiles
+        }
+        self.commands_with_arguments = {
+            'move-sink-input': self.move_sink_input,
+            'move-source-output': self.move_source_output,
+            'suspend-sink': self.suspend_sink,
+            'set-card-profile': self.set_card_profile,
+            'load-module': self.load_module,
+        }
+
+    def connect(self):
+        # A connection inherited through os.fork() (see SteamvrDaemon.create_daemon) must not be used by the child.
+        if self.pulse is not None and self.pulse_pid == os.getpid():
+            return
+
+        log.d('NativeBackend connecting to the audio server')
+        self.pulse = pulsectl.Pulse('steamvr_utils')
+        self.pulse_pid = os.getpid()
+
+    def close(self):
+        with self.lock:
+            if self.pulse is not None and self.pulse_pid == os.getpid():
+                self.pulse.close()
+            self.pulse = None
+
+    def subscribe(self, callback):
+        return NativeSubscription(callback).start()
+
+    def get_handler(self, arguments):
+        if len(arguments) == 0 or os.path.basename(arguments[0]) != 'pactl':
+            return None
+
+        pactl_arguments = tuple(arguments[1:])
+        if pactl_arguments in self.commands:
+            return self.commands[pactl_arguments]
+
+        if len(pactl_arguments) > 0 and pactl_arguments[0] in self.commands_with_arguments:
+            handler = self.commands_with_arguments[pactl_arguments[0]]
+            return lambda: handler(*pactl_arguments[1:])
+
+        return None
+
+    def run(self, arguments):
+        handler = self.get_handler(arguments)
+        if handler is None:
+            return self.fallback.run(arguments)
+
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    self.connect()
+                    return 0, handler(), ''
+                except (pulsectl.PulseOperationFailed, pulsectl.PulseIndexError, pulsectl.PulseOperationInvalid,
+                        TypeError, ValueError) as e:
+                    return 1, '', 'Failure: {}\n'.format(e)
+                except (pulsectl.PulseError, pulsectl.PulseDisconnected) as e:
+                    # the connection was lost (e.g. the server was restarted), reconnect once
+                    log.w('NativeBackend lost the connection to the audio server: {}'.format(e))
+                    self.pulse = None
+                    if attempt > 0:
+                        return 1, '', 'Connection failure: {}\n'.format(e)
+
+    @staticmethod
+    def enum_value(value):
+        return str(getattr(value, '_value', value))
+
+    def info(self):
+        server_info = self.pulse.server_info()
+        return ('Server Name: {}\n'
+                'Server Version: {}\n'
+                'User Name: {}\n'
+                'Host Name: {}\n'
+                'Default Sink: {}\n'
+                'Default Source: {}\n').format(server_info.server_name, server_info.server_version,
+                                               server_info.user_name, server_info.host_name,
+                                               server_info.default_sink_name, server_info.default_source_name)
+
+    def list_short_streams(self, streams):
+        return ''.join(
+            '{}\t{}\t{}\t-\t{}\n'.format(stream.index, stream.name, stream.driver,
+                                         self.enum_value(stream.state).upper())
+            for stream in streams
+        )
+
+    def list_short_sinks(self):
+        return self.list_short_streams(self.pulse.sink_list())
+
+    def list_short_sources(self):
+        return self.list_short_streams(self.pulse.source_list())
+
+    @staticmethod
+    def list_short_stream_connections(stream_connections, stream_attribute):
+        return ''.join(
+            '{}\t{}\t{}\t{}\t-\n'.format(
+                stream_connection.index,
+                getattr(stream_connection, stream_attribute),
+                '-' if stream_connection.client == INVALID_INDEX else stream_connection.client,
+                stream_connection.driver)
+            for stream_connection in stream_connections
+        )
+
+    def list_short_sink_inputs(self):
+        return self.list_short_stream_connections(self.pulse.sink_input_list(), 'sink')
+
+    def list_short_source_outputs(self):
+        return self.list_short_stream_connections(self.pulse.source_output_list(), 'source')
+
+    def list_short_clients(self):
+        return ''.join(
+            '{}\t{}\t{}\n'.format(client.index, client.driver,
+                                  client.proplist.get('application.process.binary', '(null)'))
+            for client in self.pulse.client_list()
+        )
+
+    def list_short_cards(self):
+        return ''.join(
+            '{}\t{}\t{}\n'.format(card.index, card.name, card.driver)
+            for card in self.pulse.card_list()
+        )
+
+    def list_short_all(self):
+        return ''.join([self.list_short_sinks(), self.list_short_sources(), self.list_short_sink_inputs(),
+                        self.list_short_source_outputs(), self.list_short_clients(), self.list_short_cards()])
+
+    def list_streams(self, title, streams):
+        """
+        Subset of `pactl list sinks` or `pactl list sources` (only the fields used by `pactl_interface.snapshot()`),
+        as are the other `list_*()` methods.
+        """
+        lines = []
+        for stream in streams:
+            lines.append('{} #{}'.format(title, stream.index))
+            lines.append('\tState: {}'.format(self.enum_value(stream.state).upper()))
+            lines.append('\tName: {}'.format(stream.name))
+            lines.append('\tDriver: {}'.format(stream.driver))
+        return ''.join(line + '\n' for line in lines)
+
+    def list_sinks(self):
+        return self.list_streams('Sink', self.pulse.sink_list())
+
+    def list_sources(self):
+        return self.list_streams('Source', self.pulse.source_list())
+
+    def list_stream_connections(self, title, stream_title, stream_attribute, stream_connections):
+        lines = []
+        for stream_connection in stream_connections:
+            lines.append('{} #{}'.format(title, stream_connection.index))
+            lines.append('\tDriver: {}'.format(stream_connection.driver))
+            lines.append('\tClient: {}'.format(
+                'n/a' if stream_connection.client == INVALID_INDEX else stream_connection.client))
+            lines.append('\t{}: {}'.format(stream_title, getattr(stream_connection, stream_attribute)))
+        return ''.join(line + '\n' for line in lines)
+
+    def list_sink_inputs(self):
+        return self.list_stream_connections('Sink Input', 'Sink', 'sink', self.pulse.sink_input_list())
+
+    def list_source_outputs(self):
+        return self.list_stream_connections('Source Output', 'Source', 'source', self.pulse.source_output_list())
+
+    def list_clients(self):
+        lines = []
+        for client in self.pulse.client_list():
+            lines.append('Client #{}'.format(client.index))
+            lines.append('\tDriver: {}'.format(client.driver))
+            lines.append('\tProperties:')
+            for key, value in client.proplist.items():
+                lines.append('\t\t{} = "{}"'.format(key, value))
+        return ''.join(line + '\n' for line in lines)
+
+    def list_all(self):
+        """
+        Subset of `pactl list` (without cards, see `NativeBackend.commands`).
+        """
+        return ''.join([self.list_sinks(), self.list_sources(), self.list_sink_inputs(), self.list_source_outputs(),
+                        self.list_clients()])
+
+    def move_sink_input(self, sink_input_id, sink_name):
+        self.pulse.sink_input_move(int(sink_input_id), self.pulse.get_sink_by_name(sink_name).index)
+        return ''
+
+    def move_source_output(self, source_output_id, source_name):
+        self.pulse.source_output_move(int(source_output_id), self.pulse.get_source_by_name(source_name).index)
+        return ''
+
+    def suspend_sink(self, sink_name, state):
+        if state not in ['true', 'false', '1', '0']:
+            raise ValueError('Invalid suspend state: {}'.format(state))
+        self.pulse.sink_suspend(self.pulse.get_sink_by_name(sink_name).index, state in ['true', '1'])
+        return ''
+
+    def set_card_profile(self, card_name, profile_name):
+        self.pulse.card_profile_set_by_index(self.pulse.get_card_by_name(card_name).index, profile_name)
+        return ''
+
+    def load_module(self, name, *module_arguments):
+        return '{}\n'.format(self.pulse.module_load(name, ' '.join(module_arguments)))
+
+
+class NativeSubscription(Subscription):
+    """
+    Subscription based on a second connection to the audio server (the connection of `NativeBackend` can not be used
+    while waiting for events).
+    """
+
+    def listen(self):
+        events = []
+
+        def on_event(pulse_event):
+            events.append(Event(NativeBackend.enum_value(pulse_event.t),
+                                NativeBackend.enum_value(pulse_event.facility).replace('_', '-'),
+                                pulse_event.index))
+            raise pulsectl.PulseLoopStop()  # return from event_listen() to handle the event immediately
+
+        try:
+            with pulsectl.Pulse('steamvr_utils-subscription') as pulse:
+                pulse.event_mask_set('all')
+                pulse.event_callback_set(on_event)
+
+                while not self.stopped:
+                    pulse.event_listen(timeout=0.5)
+
+                    while len(events) > 0 and not self.stopped:
+                        self.dispatch(events.pop(0))
+        except (pulsectl.PulseError, pulsectl.PulseDisconnected) as e:
+            if not self.stopped:
+                log.e('NativeSubscription lost the connection to the audio server: {}'.format(e))
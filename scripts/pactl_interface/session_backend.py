@@ -0,0 +1,163 @@
+import collections
+import gzip
+import json
+import threading
+import time
+
+import log
+
+from .backend import Backend
+from .subscription import Subscription
+
+
+def open_session_file(path):
+    """
+    A session file has one JSON object per line: a header first, then one record per command.
+    Session files can be compressed with gzip (the path has to end with '.gz').
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+class RecordingBackend(Backend):
+    """
+    Passes all commands to `backend` and appends every command, its output and its duration to the session file at
+    `path` (see `ReplayBackend`). Every record is written immediately, so a session is kept even if the process dies.
+    """
+
+    def __init__(self, backend, path, header=None):
+        self.backend = backend
+        self.path = path
+        self.lock = threading.Lock()  # commands might be run by multiple threads
+
+        # not compressed, the daemon keeps writing to this file after os.fork() (see SteamvrDaemon.create_daemon)
+        self.file = open(path, 'w', encoding='utf-8')
+        self.write(dict(header or {}, version=1))
+        log.i('Recording pactl session to: {}'.format(path))
+
+    def write(self, data):
+        with self.lock:
+            self.file.write(json.dumps(data, separators=(',', ':'), default=str) + '\n')
+            self.file.flush()
+
+    def record(self, arguments, result, duration):
+        return_code, stdout, stderr = result
+        self.write({'arguments': list(arguments), 'return_code': return_code, 'stdout': stdout, 'stderr': stderr,
+                    'duration': round(duration, 6)})
+
+    def run(self, arguments):
+        start = time.perf_counter()
+        result = self.backend.run(arguments)
+        self.record(arguments, result, time.perf_counter() - start)
+        return result
+
+    def run_batch(self, arguments_list):
+        # the commands of a batch run at the same time, each of them is recorded with the duration of the batch
+        start = time.perf_counter()
+        results = self.backend.run_batch(arguments_list)
+        duration = time.perf_counter() - start
+        for arguments, result in zip(arguments_list, results):
+            self.record(arguments, result, duration)
+        return results
+
+    def subscribe(self, callback):
+        return self.backend.subscribe(callback)
+
+    def close(self):
+        self.backend.close()
+        with self.lock:
+            self.file.close()
+
+
+class ReplaySubscription(Subscription):
+    """
+    Never reports an event, events are not part of a session.
+    """
+
+    def __init__(self, callback):
+        super().__init__(callback)
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        super().stop()
+        self.stop_event.set()
+
+    def listen(self):
+        self.stop_event.wait()
+
+
+class ReplayBackend(Backend):
+    """
+    Answers commands with the responses from a session file written by `RecordingBackend`, without any audio server.
+    The responses to the same command are returned in the order in which they were recorded, the last one is repeated
+    once all of them were used. With `realtime`, every command takes as long as it took while recording.
+    Commands which change the audio server (e.g. moves) succeed without output if no response was recorded for them,
+    sessions recorded by `debug_dump.py --record` contain none (the recorded lists do not change in either case).
+    """
+
+    write_commands = ['move-sink-input', 'move-source-output', 'suspend-sink', 'set-card-profile']
+
+    def __init__(self, path, realtime=False):
+        self.path = path
+        self.realtime = realtime
+
+        self.header = None
+        self.responses = collections.defaultdict(list)  # arguments (tuple) -> records
+        self.next_response = collections.defaultdict(int)  # arguments (tuple) -> index in self.responses
+        self.call_count = 0
+        self.lock = threading.Lock()
+
+        with open_session_file(path) as session_file:
+            for line in session_file:
+                data = json.loads(line)
+                if self.header is None:
+                    self.header = data
+                else:
+                    self.responses[tuple(data['arguments'])].append(data)
+
+        if self.header is None:
+            raise RuntimeError('Empty session file: {}'.format(path))
+
+    def get_response(self, arguments):
+        key = tuple(arguments)
+        with self.lock:
+            self.call_count += 1
+            records = self.responses.get(key)
+            if records is None:
+                return None
+
+            index = self.next_response[key]
+            self.next_response[key] = min(index + 1, len(records) - 1)
+            return records[index]
+
+    def get_result(self, arguments, record):
+        if record is not None:
+            return record['return_code'], record['stdout'], record['stderr']
+        if len(arguments) > 1 and arguments[1] in self.write_commands:
+            return 0, '', ''
+        return 1, '', 'No response recorded for: {}\n'.format(' '.join(arguments))
+
+    def run(self, arguments):
+        record = self.get_response(arguments)
+        if self.realtime and record is not None:
+            time.sleep(record['duration'])
+        return self.get_result(arguments, record)
+
+    def run_batch(self, arguments_list):
+        records = [self.get_response(arguments) for arguments in arguments_list]
+        if self.realtime:
+            # the commands of a batch ran at the same time
+            time.sleep(max([record['duration'] for record in records if record is not None], default=0))
+
+        return [self.get_result(arguments, record) for arguments, record in zip(arguments_list, records)]
+
+    def subscribe(self, callback):
+        return ReplaySubscription(callback).start()
+
+    def rewind(self):
+        """
+        Starts again with the first recorded response of every command.
+        """
+        with self.lock:
+            self.next_response.clear()
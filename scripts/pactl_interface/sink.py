@@ -5,8 +5,8 @@ from .stream import Stream
 
 
 class Sink(Stream):
-    def __init__(self, line):
-        super().__init__(line)
+    def __init__(self, id, name):
+        super().__init__(id, name)
 
     def set_suspend_state(self, config, state):
         if config.dry_run():
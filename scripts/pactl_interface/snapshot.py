@@ -0,0 +1,130 @@
+import collections
+import re
+import types
+
+from . import utlis
+from .client import Client
+from .sink import Sink
+from .sink_input import SinkInput
+from .source import Source
+from .source_output import SourceOutput
+
+
+class Snapshot(collections.namedtuple('Snapshot', [
+    'server_info', 'sinks', 'sources', 'sink_inputs', 'source_outputs', 'clients'
+])):
+    """
+    Immutable state of the audio server at one point in time (see `snapshot()`).
+    `server_info` maps the fields of `pactl info` to their values, every other field is a tuple of objects.
+    """
+
+    def default_sink_name(self):
+        return self.server_info.get('Default Sink')
+
+    def default_source_name(self):
+        return self.server_info.get('Default Source')
+
+    def get(self, facility):
+        return {
+            'sink': self.sinks,
+            'source': self.sources,
+            'sink-input': self.sink_inputs,
+            'source-output': self.source_outputs,
+            'client': self.clients,
+        }[facility]
+
+
+def parse_info(info):
+    server_info = {}
+    for line in info.splitlines():
+        key, separator, value = line.partition(': ')
+        if separator:
+            server_info[key] = value
+    return server_info
+
+
+def parse_list(output):
+    """
+    Parses the output of `pactl list` into a dict of section type (e.g. 'Sink Input') -> list of sections.
+    Each section is a dict with the index (key '#'), the top level fields and the properties (key 'Properties').
+    """
+    sections = collections.defaultdict(list)
+    section = None
+    in_properties = False
+
+    for line in output.splitlines():
+        if len(line) == 0:
+            continue
+
+        if line[0] != '\t' and line[0] != ' ':
+            match = re.match(r'^(.*) #(\d+)$', line)
+            if match is None:
+                section = None
+                continue
+            section = {'#': int(match.group(2)), 'Properties': {}}
+            sections[match.group(1)].append(section)
+            in_properties = False
+
+        elif section is None:
+            continue
+
+        elif line.startswith('\t\t'):
+            if in_properties:
+                key, separator, value = line.strip().partition(' = ')
+                if separator:
+                    section['Properties'][key] = value.strip('"')
+
+        else:
+            key, separator, value = line.strip().partition(':')
+            in_properties = key == 'Properties' and value == ''
+            if separator and not in_properties:
+                section[key] = value.strip()
+
+    return sections
+
+
+def parse_client_id(value):
+    if value is None or value == 'n/a':
+        return None
+    return int(value)
+
+
+def snapshot(output_logger=None):
+    """
+    Returns a `Snapshot` of all sinks, sources, sink-inputs, source-outputs and clients, using only `pactl info` and
+    `pactl list <type>` of these types (executed as one batch). Cards are not listed, a plain `pactl list` would
+    include all of their profiles and ports (see `CardCache`).
+    """
+    commands = [['pactl', 'info']] + [
+        ['pactl', 'list', list_type] for list_type in ['sinks', 'sources', 'sink-inputs', 'source-outputs', 'clients']
+    ]
+    results = utlis.run_batch(commands, assert_success=True)
+    info = results[0][1]
+
+    if output_logger is not None:
+        for arguments, (_, stdout, _) in zip(commands, results):
+            output_logger.add_output(arguments, stdout, print_first=True)
+
+    sections = parse_list('\n'.join(stdout for _, stdout, _ in results[1:]))
+
+    clients = tuple(
+        Client(section['#'], section['Properties'].get('application.process.binary', '(null)'))
+        for section in sections['Client']
+    )
+    clients_by_id = types.MappingProxyType(Client.get_clients_by_id(clients))
+
+    return Snapshot(
+        server_info=parse_info(info),
+        sinks=tuple(Sink(section['#'], section['Name']) for section in sections['Sink']),
+        sources=tuple(Source(section['#'], section['Name']) for section in sections['Source']),
+        sink_inputs=tuple(
+            SinkInput(section['#'], int(section['Sink']), parse_client_id(section.get('Client')), clients_by_id)
+            for section in sections['Sink Input']
+        ),
+        source_outputs=tuple(
+            SourceOutput(section['#'], int(section['Source']), parse_client_id(section.get('Client')),
+                         clients_by_id)
+            for section in sections['Source Output']
+        ),
+        clients=clients,
+    )
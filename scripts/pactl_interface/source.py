@@ -2,8 +2,8 @@ from .stream import Stream
 
 
 class Source(Stream):
-    def __init__(self, line):
-        super().__init__(line)
+    def __init__(self, id, name):
+        super().__init__(id, name)
 
     @classmethod
     def get_all_sources(cls, output_logger=None):
@@ -2,8 +2,8 @@ from .stream_connection import StreamConnection
 
 
 class SourceOutput(StreamConnection):
-    def __init__(self, line):
-        super().__init__(line)
+    def __init__(self, id, stream_id, client_id, clients_by_id=None):
+        super().__init__(id, stream_id, client_id, clients_by_id)
 
     @classmethod
     def get_all_source_outputs(cls, output_logger=None):
@@ -0,0 +1,150 @@
+import threading
+
+import log
+
+from .card_cache import CardCache
+from .client import Client
+from .sink import Sink
+from .sink_input import SinkInput
+from .snapshot import snapshot
+from .source import Source
+from .source_output import SourceOutput
+
+
+class State:
+    """
+    Cache of the objects on the audio server, keyed by their index.
+
+    Each facility is only listed again after it was invalidated, either explicitly with `invalidate()` or by an event
+    (see `handle_event()`). When a facility is listed again, objects which did not change are kept.
+    If multiple facilities need to be listed, all of them are updated from one `snapshot()`.
+    """
+
+    facilities = ['sink', 'source', 'sink-input', 'source-output', 'client']
+
+    def __init__(self, output_logger=None):
+        self.output_logger = output_logger
+
+        self.objects = {facility: {} for facility in self.facilities}  # facility -> index -> object
+        self.dirty = set(self.facilities)  # facilities which need to be listed again
+        self.server_info = None  # from the most recent snapshot
+        self.card_cache = CardCache()
+        self.lock = threading.RLock()
+
+    def invalidate(self, facility=None):
+        with self.lock:
+            if facility is None:
+                self.dirty = set(self.facilities)
+                self.card_cache.check()
+            elif facility in self.facilities:
+                self.dirty.add(facility)
+            elif facility == 'card':
+                self.card_cache.invalidate()
+
+    def handle_event(self, event):
+        if event.facility == 'card':
+            self.card_cache.invalidate()
+            return
+
+        if event.facility not in self.facilities:
+            return
+
+        with self.lock:
+            if event.type == 'remove':
+                self.objects[event.facility].pop(event.index, None)
+            else:
+                self.dirty.add(event.facility)
+
+    def list_facility(self, facility):
+        if facility == 'sink':
+            return Sink.get_all_sinks(self.output_logger)
+        elif facility == 'source':
+            return Source.get_all_sources(self.output_logger)
+        elif facility == 'sink-input':
+            return SinkInput.get_all_sink_inputs(self.output_logger)
+        elif facility == 'source-output':
+            return SourceOutput.get_all_source_outputs(self.output_logger)
+        elif facility == 'client':
+            return Client.get_all_clients(self.output_logger)
+        else:
+            raise NotImplementedError()
+
+    @staticmethod
+    def is_unchanged(old_object, new_object):
+        if isinstance(new_object, Client):
+            return old_object.client_name == new_object.client_name
+        elif isinstance(new_object, (SinkInput, SourceOutput)):
+            return old_object.client_id == new_object.client_id and old_object.stream_id == new_object.stream_id
+        else:
+            return old_object.name == new_object.name
+
+    def refresh(self, facility, listed_objects):
+        old_objects = self.objects[facility]
+        new_objects = {}
+
+        for new_object in listed_objects:
+            index = new_object.id if hasattr(new_object, 'id') else new_object.client_id
+            old_object = old_objects.get(index)
+            if old_object is not None and self.is_unchanged(old_object, new_object):
+                new_objects[index] = old_object
+            else:
+                new_objects[index] = new_object
+
+        added = new_objects.keys() - old_objects.keys()
+        removed = old_objects.keys() - new_objects.keys()
+        if len(added) > 0 or len(removed) > 0:
+            log.d('State of {} changed, added: {}, removed: {}'.format(facility, sorted(added), sorted(removed)))
+
+        # updated in place, stream connections keep a reference to self.objects['client'] (see get_stream_connections())
+        old_objects.clear()
+        old_objects.update(new_objects)
+        self.dirty.discard(facility)
+
+    def refresh_from_snapshot(self):
+        current_snapshot = snapshot(self.output_logger)
+        self.server_info = current_snapshot.server_info
+        for facility in self.facilities:
+            self.refresh(facility, current_snapshot.get(facility))
+
+    def get(self, facility):
+        with self.lock:
+            if len(self.dirty) > 1:
+                self.refresh_from_snapshot()
+            elif facility in self.dirty:
+                self.refresh(facility, self.list_facility(facility))
+            return list(self.objects[facility].values())
+
+    def get_server_info(self):
+        with self.lock:
+            if self.server_info is None:
+                self.refresh_from_snapshot()
+            return self.server_info
+
+    def get_sinks(self):
+        return self.get('sink')
+
+    def get_sources(self):
+        return self.get('source')
+
+    def get_clients(self):
+        return self.get('client')
+
+    def get_stream_connections(self, facility):
+        with self.lock:
+            stream_connections = self.get(facility)
+
+            clients_by_id = self.objects['client']
+            for stream_connection in stream_connections:
+                stream_connection.clients_by_id = clients_by_id
+
+            if 'client' in self.dirty and any(stream_connection.client_id is not None and stream_connection.client is None
+                                              for stream_connection in stream_connections):
+                self.get('client')  # a new client connected since clients were last listed
+
+            return stream_connections
+
+    def get_sink_inputs(self):
+        return self.get_stream_connections('sink-input')
+
+    def get_source_outputs(self):
+        return self.get_stream_connections('source-output')
@@ -2,8 +2,14 @@ from . import utlis
 
 
 class Stream:
-    def __init__(self, line):
-        self.name = line.split('\t')[1]
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_short_line(cls, line):
+        fields = line.split('\t')
+        return cls(int(fields[0]), fields[1])
 
     @staticmethod
     def _get_all(type_name, python_class, output_logger=None):
@@ -17,5 +23,5 @@ class Stream:
 
         streams_lines = stdout.split('\n')[:-1]
 
-        streams = [python_class(line) for line in streams_lines]
+        streams = [python_class.from_short_line(line) for line in streams_lines]
         return streams
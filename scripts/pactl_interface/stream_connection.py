@@ -2,16 +2,35 @@ from . import utlis
 
 
 class StreamConnection:
-    def __init__(self, line):
-        self.id = int(line.split('\t')[0])
-        client_id_str = line.split('\t')[2]
-
-        if client_id_str == "-":
-            self.client_id = None
+    def __init__(self, id, stream_id, client_id, clients_by_id=None):
+        self.id = id
+        self.stream_id = stream_id  # index of the sink/source this is connected to
+        self.client_id = client_id
+        self.clients_by_id = clients_by_id  # client_id -> Client, used to resolve self.client when needed
+
+    @property
+    def client(self):
+        if self.client_id is None or self.clients_by_id is None:
+            return None
+        return self.clients_by_id.get(self.client_id)
+
+    @property
+    def client_name(self):
+        client = self.client
+        if client is None:
+            return None
+        return client.client_name
+
+    @classmethod
+    def from_short_line(cls, line):
+        fields = line.split('\t')
+
+        if fields[2] == "-":
+            client_id = None
         else:
-            self.client_id = int(client_id_str)
+            client_id = int(fields[2])
 
-        self.client_name = None
+        return cls(int(fields[0]), int(fields[1]), client_id)
 
     @staticmethod
     def _get_all(type_name, python_class, output_logger=None):
@@ -25,5 +44,5 @@ class StreamConnection:
 
         stream_connections_lines = stdout.split('\n')[:-1]
 
-        stream_connections = [python_class(line) for line in stream_connections_lines]
+        stream_connections = [python_class.from_short_line(line) for line in stream_connections_lines]
         return stream_connections
@@ -0,0 +1,98 @@
+import os
+import re
+import subprocess
+import threading
+
+import log
+
+
+class Event:
+    """
+    A change on the audio server, as reported by `pactl subscribe`: "Event 'new' on sink-input #12"
+    """
+
+    def __init__(self, event_type, facility, index):
+        self.type = event_type  # 'new', 'change' or 'remove'
+        self.facility = facility  # e.g. 'sink', 'sink-input', 'client', 'card' (with '-' as in the output of pactl)
+        self.index = index
+
+    @classmethod
+    def from_line(cls, line):
+        match = re.match(r"^Event '([a-z]+)' on ([a-z-]+) #(\d+)$", line.strip())
+        if match is None:
+            return None
+        return cls(match.group(1), match.group(2), int(match.group(3)))
+
+    def __repr__(self):
+        return '<EVENT type: {}, facility: {}, index: {}>'.format(self.type, self.facility, self.index)
+
+
+class Subscription:
+    """
+    Calls `callback` with an `Event` for every change on the audio server, from a separate thread.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.thread = None
+        self.stopped = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self.listen, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive() and not self.stopped
+
+    def listen(self):
+        raise NotImplementedError()
+
+    def dispatch(self, event):
+        # noinspection PyBroadException
+        try:
+            self.callback(event)
+        except Exception:
+            log.e('Handling of {} failed:'.format(event), exc_info=True)
+
+
+class PactlSubscription(Subscription):
+    """
+    Subscription based on a single long-running `pactl subscribe` process.
+    """
+
+    def __init__(self, callback):
+        super().__init__(callback)
+        self.process = None
+
+    def start(self):
+        environment = dict(os.environ)
+        environment['LC_ALL'] = 'C'  # https://github.com/DavidRisch/steamvr_utils/issues/2
+
+        self.process = subprocess.Popen(['pactl', 'subscribe'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        env=environment, universal_newlines=True)
+        return super().start()
+
+    def stop(self):
+        super().stop()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+    def listen(self):
+        for line in self.process.stdout:
+            if self.stopped:
+                break
+
+            event = Event.from_line(line)
+            if event is None:
+                log.w('Unexpected output of \'pactl subscribe\': {}'.format(line))
+                continue
+
+            self.dispatch(event)
+
+        if not self.stopped:
+            log.e('\'pactl subscribe\' exited unexpectedly (return code: {})'.format(self.process.wait()))
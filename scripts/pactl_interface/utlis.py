@@ -1,22 +1,75 @@
-import os
-import subprocess
+import time
 
+import metrics
+import tracing
+
+from .backend import SubprocessBackend
+
+_backend = SubprocessBackend()
+
+
+def set_backend(backend):
+    global _backend
+    _backend.close()
+    _backend = backend
 
-def run(arguments, assert_success=True):
-    environment = dict(os.environ)
-    environment['LC_ALL'] = 'C'  # https://github.com/DavidRisch/steamvr_utils/issues/2
 
-    process = subprocess.run(arguments, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=environment)
+def get_backend():
+    return _backend
 
-    return_code = process.returncode
-    stdout = process.stdout.decode()
-    stderr = process.stderr.decode()
 
-    if assert_success and return_code != 0:
+def check_result(arguments, return_code, stdout, stderr):
+    if return_code != 0:
         raise RuntimeError(
             'Running \'{}\' failed with return code {}.\n'.format(' '.join(arguments), return_code)
             + 'stdout:\n{}'.format(stdout)
             + 'stderr:\n{}'.format(stderr)
         )
 
+
+def get_command_name(arguments):
+    """
+    Returns the name of a command for metrics, e.g. 'list short sinks' or 'move-sink-input' (without its arguments).
+    """
+    if len(arguments) > 1 and arguments[1] == 'list':
+        return ' '.join(arguments[1:])
+    return ' '.join(arguments[1:2])
+
+
+def record_metrics(arguments, return_code, duration):
+    command_name = get_command_name(arguments)
+    metrics.observe('pactl_call_seconds', duration, {'command': command_name})
+    if return_code != 0:
+        metrics.increment('pactl_failures_total', {'command': command_name})
+
+
+def run(arguments, assert_success=True):
+    start = time.perf_counter()
+    with tracing.Span('pactl {}'.format(get_command_name(arguments)), 'pactl', {'arguments': ' '.join(arguments)}) as span:
+        return_code, stdout, stderr = _backend.run(arguments)
+        span.args['return_code'] = return_code
+    record_metrics(arguments, return_code, time.perf_counter() - start)
+
+    if assert_success:
+        check_result(arguments, return_code, stdout, stderr)
+
     return return_code, stdout, stderr
+
+
+def run_batch(arguments_list, assert_success=True):
+    start = time.perf_counter()
+    with tracing.Span('pactl batch', 'pactl', {'commands': [' '.join(arguments) for arguments in arguments_list]}):
+        results = _backend.run_batch(arguments_list)
+    duration = time.perf_counter() - start  # the commands of a batch run at the same time
+    for arguments, (return_code, stdout, stderr) in zip(arguments_list, results):
+        record_metrics(arguments, return_code, duration)
+
+    if assert_success:
+        for arguments, result in zip(arguments_list, results):
+            check_result(arguments, *result)
+
+    return results
+
+
+def subscribe(callback):
+    return _backend.subscribe(callback)
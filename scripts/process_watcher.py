@@ -0,0 +1,260 @@
+import os
+import select
+import socket
+import struct
+import threading
+
+import log
+
+# see linux/connector.h and linux/cn_proc.h
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+NLMSG_DONE = 3
+
+NLMSG_HEADER = struct.Struct('=IHHII')  # len, type, flags, seq, pid
+CN_MSG_HEADER = struct.Struct('=IIIIHH')  # idx, val, seq, ack, len, flags
+PROC_EVENT_HEADER = struct.Struct('=IIQ')  # what, cpu, timestamp_ns
+PROC_EVENT_PIDS = struct.Struct('=ii')  # process_pid, process_tgid (start of exec and exit events)
+
+
+def find_pids(process_name):
+    """
+    Returns the pids of all running processes with the command name `process_name` (like `ps -C`), by reading /proc.
+    """
+    comm = process_name[:15]  # the kernel truncates command names to 15 characters
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        if read_comm(int(entry)) == comm and is_alive(int(entry)):
+            pids.append(int(entry))
+    return pids
+
+
+def read_comm(pid):
+    try:
+        with open('/proc/{}/comm'.format(pid), 'r') as comm_file:
+            return comm_file.read().rstrip('\n')
+    except OSError:
+        return None  # the process exited in the meantime
+
+
+def read_stat(pid):
+    """
+    Returns the fields of /proc/<pid>/stat after the command name (the first one is the state, field 3 in proc(5)), or
+    None if the process does not exist.
+    """
+    try:
+        with open('/proc/{}/stat'.format(pid), 'r') as stat_file:
+            content = stat_file.read()
+    except OSError:
+        return None
+    # the command name is in parentheses and might contain spaces and parentheses itself
+    return content[content.rfind(')') + 2:].split()
+
+
+def is_alive(pid, fields=None):
+    """
+    Returns False if the process does not exist or has exited but was not reaped by its parent yet (a zombie).
+    """
+    fields = read_stat(pid) if fields is None else fields
+    return fields is not None and len(fields) > 0 and fields[0] not in ['Z', 'X']
+
+
+def get_start_time(fields):
+    """
+    Returns the start time (in clock ticks after boot, field 22 in proc(5)) from the fields returned by `read_stat()`,
+    which identifies a process together with its pid (a reused pid belongs to a process with another start time).
+    """
+    return int(fields[19]) if fields is not None and len(fields) > 19 else None
+
+
+class ProcScanner:
+    """
+    Finds a process named `process_name` in /proc. Once one was found, `scan()` only reads /proc/<pid>/stat of that
+    process until it exits, only then /proc is scanned again.
+    """
+
+    def __init__(self, process_name):
+        self.process_name = process_name
+        self.pid = None
+        self.pid_start_time = None  # changes if the pid is reused by another process
+
+    def scan(self):
+        """
+        Returns the pid of a running process named `process_name`, or None.
+        """
+        if self.pid is not None:
+            fields = read_stat(self.pid)
+            if is_alive(self.pid, fields) and get_start_time(fields) == self.pid_start_time:
+                return self.pid
+
+        pids = find_pids(self.process_name)
+        self.pid = pids[0] if len(pids) > 0 else None
+        self.pid_start_time = get_start_time(read_stat(self.pid)) if self.pid is not None else None
+        return self.pid
+
+
+class ProcessWatcher:
+    """
+    Watches for the start and exit of processes named `process_name`, without starting any processes itself.
+    `on_change(running)` is called from a separate thread whenever `is_running()` changes.
+
+    Methods, in the order they are tried with method 'auto':
+    - 'netlink': the Linux proc connector reports every exec and exit (requires CAP_NET_ADMIN).
+    - 'pidfd': waits for the exit of a known pid with `pidfd_open()`, while no pid is known /proc is scanned.
+    - 'proc': checks every `interval` seconds if a known pid still exists (see `ProcScanner`).
+    """
+
+    methods = ['auto', 'netlink', 'pidfd', 'proc']
+
+    def __init__(self, process_name, on_change=None, method='auto', interval=1.0):
+        if method not in self.methods:
+            raise RuntimeError('Invalid process watcher method: {}, valid options: {}'.format(method, self.methods))
+
+        self.process_name = process_name
+        self.on_change = on_change
+        self.method = method
+        self.interval = interval
+
+        self.pids = set()
+        self.proc_scanner = ProcScanner(process_name)
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.netlink_socket = None
+
+    def start(self):
+        method = self.method
+        if method in ['auto', 'netlink']:
+            try:
+                self.netlink_socket = self.open_netlink_socket()
+                method = 'netlink'
+            except OSError as e:
+                if method == 'netlink':
+                    raise
+                log.d('ProcessWatcher can not use the proc connector: {}'.format(e))
+                method = 'pidfd'
+        if method == 'pidfd' and not hasattr(os, 'pidfd_open'):
+            log.d('ProcessWatcher can not use pidfd_open()')
+            method = 'proc'
+
+        log.i('ProcessWatcher watching for {} (method: {})'.format(self.process_name, method))
+        self.pids = set(find_pids(self.process_name))
+
+        target = {'netlink': self.listen_netlink, 'pidfd': self.wait_pidfd, 'proc': self.poll_proc}[method]
+        self.thread = threading.Thread(target=target, name='ProcessWatcher', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def is_running(self):
+        with self.lock:
+            return len(self.pids) > 0
+
+    def update_pids(self, added=(), removed=()):
+        with self.lock:
+            was_running = len(self.pids) > 0
+            self.pids.update(added)
+            self.pids.difference_update(removed)
+            running = len(self.pids) > 0
+
+        if running != was_running:
+            log.d('ProcessWatcher: {} {}'.format(self.process_name, 'started' if running else 'exited'))
+            if self.on_change is not None:
+                self.on_change(running)
+
+    @staticmethod
+    def open_netlink_socket():
+        netlink_socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            netlink_socket.bind((os.getpid(), CN_IDX_PROC))
+
+            payload = struct.pack('=I', PROC_CN_MCAST_LISTEN)
+            cn_msg = CN_MSG_HEADER.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+            nlmsg = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(cn_msg), NLMSG_DONE, 0, 0, os.getpid()) + cn_msg
+            netlink_socket.send(nlmsg)
+        except OSError:
+            netlink_socket.close()
+            raise
+
+        netlink_socket.settimeout(0.5)  # to notice stop()
+        return netlink_socket
+
+    def listen_netlink(self):
+        comm = self.process_name[:15]
+        try:
+            while not self.stopped.is_set():
+                try:
+                    data = self.netlink_socket.recv(4096)
+                except socket.timeout:
+                    continue
+
+                offset = NLMSG_HEADER.size + CN_MSG_HEADER.size
+                if len(data) < offset + PROC_EVENT_HEADER.size + PROC_EVENT_PIDS.size:
+                    continue
+                what, _, _ = PROC_EVENT_HEADER.unpack_from(data, offset)
+                pid, tgid = PROC_EVENT_PIDS.unpack_from(data, offset + PROC_EVENT_HEADER.size)
+                if pid != tgid:
+                    continue  # a thread, not a process
+
+                if what == PROC_EVENT_EXEC and read_comm(pid) == comm:
+                    self.update_pids(added=[pid])
+                elif what == PROC_EVENT_EXIT and pid in self.pids:
+                    self.update_pids(removed=[pid])
+        except OSError as e:
+            log.e('ProcessWatcher lost the proc connector, scanning /proc instead: {}'.format(e))
+            self.poll_proc()
+        finally:
+            self.netlink_socket.close()
+
+    def wait_pidfd(self):
+        exited = None  # (pid, start time) of the process which exited, not added again (e.g. while it is a zombie)
+        while not self.stopped.is_set():
+            with self.lock:
+                pid = next(iter(self.pids), None)
+
+            if pid is None:
+                self.stopped.wait(self.interval)
+                pid = self.proc_scanner.scan()
+                if pid is not None and (pid, get_start_time(read_stat(pid))) == exited:
+                    pid = None
+                self.update_pids(added=[pid] if pid is not None else [])
+                continue
+
+            try:
+                pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                self.update_pids(removed=[pid])
+                continue
+
+            try:
+                poll = select.poll()
+                poll.register(pidfd, select.POLLIN)
+                while not self.stopped.is_set() and len(poll.poll(500)) == 0:
+                    pass
+            finally:
+                os.close(pidfd)
+
+            if not self.stopped.is_set():
+                # another process with the same name might have started in the meantime
+                exited = (pid, get_start_time(read_stat(pid)))
+                self.update_pids(added=[other_pid for other_pid in find_pids(self.process_name) if other_pid != pid],
+                                 removed=[pid])
+
+    def poll_proc(self):
+        while not self.stopped.wait(self.interval):
+            pid = self.proc_scanner.scan()
+            pids = {pid} if pid is not None else set()
+            with self.lock:
+                removed = self.pids - pids
+            self.update_pids(added=pids, removed=removed)
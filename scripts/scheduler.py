@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+
+import log
+import metrics
+
+
+class AdaptiveInterval:
+    """
+    Interval which grows by `factor` with every `back_off()` (up to `maximum`) and is reset to `minimum` by `reset()`.
+    """
+
+    def __init__(self, minimum, maximum, factor=2.0):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.factor = factor
+        self.value = minimum
+
+    def reset(self):
+        self.value = self.minimum
+        return self.value
+
+    def back_off(self):
+        self.value = min(self.value * self.factor, self.maximum)
+        return self.value
+
+
+class Scheduler:
+    """
+    Runs tasks periodically, all in the thread which calls `run()`, each with its own interval.
+    The deadlines of a task advance by its interval (based on `time.monotonic()`), so they do not drift. If a task
+    takes longer than its interval, this is logged and the runs it missed are skipped instead of being run back to back.
+    """
+
+    class Task:
+        def __init__(self, name, function, interval, next_run):
+            self.name = name
+            self.function = function
+            self.interval = interval
+            self.next_run = next_run
+            self.pending = False  # set by run_now(), even while the task is running
+
+    def __init__(self):
+        self.tasks = []
+        self.stopped = False
+        self.wake_up = threading.Event()  # set to interrupt waiting for the next deadline
+        self.lock = threading.Lock()  # tasks might be added or triggered by other threads
+
+    def add(self, name, function, interval, delay=0):
+        with self.lock:
+            self.tasks.append(self.Task(name, function, interval, time.monotonic() + delay))
+        self.wake_up.set()
+
+    def set_interval(self, name, interval):
+        """
+        Changes the interval of the task `name`. Called by the task itself, the new interval is used for its next run.
+        """
+        with self.lock:
+            for task in self.tasks:
+                if task.name == name and task.interval != interval:
+                    task.interval = interval
+                    task.next_run = min(task.next_run, time.monotonic() + interval)
+        self.wake_up.set()
+
+    def run_now(self, name):
+        """
+        Makes the task `name` run as soon as possible (can be called from any thread).
+        """
+        with self.lock:
+            for task in self.tasks:
+                if task.name == name:
+                    task.next_run = time.monotonic()
+                    task.pending = True
+        self.wake_up.set()
+
+    def stop(self):
+        self.stopped = True
+        self.wake_up.set()
+
+    def get_next_task(self):
+        with self.lock:
+            if len(self.tasks) == 0:
+                return None
+            return min(self.tasks, key=lambda task: task.next_run)
+
+    def run(self):
+        """
+        Runs tasks until `stop()` is called.
+        """
+        while not self.stopped:
+            task = self.get_next_task()
+            delay = task.next_run - time.monotonic() if task is not None else None
+            if delay is None or delay > 0:
+                self.wake_up.wait(delay)
+                self.wake_up.clear()
+                continue
+
+            with self.lock:
+                task.pending = False  # a request made while the task runs is kept for after this run
+
+            start = time.monotonic()
+            try:
+                task.function()
+            except Exception as e:
+                log.e('Scheduler task {} failed:'.format(task.name), exc_info=e)
+            end = time.monotonic()
+            metrics.observe('scheduler_task_seconds', end - start, {'task': task.name})
+            metrics.set_gauge('scheduler_task_interval_seconds', task.interval, {'task': task.name})
+
+            with self.lock:
+                if task.pending:
+                    task.next_run = end  # run_now() was called while the task was running
+                    continue
+
+                task.next_run += task.interval
+                if task.next_run <= end:
+                    missed_runs = math.floor((end - task.next_run) / task.interval) + 1
+                    metrics.increment('scheduler_skipped_runs_total', {'task': task.name}, missed_runs)
+                    log.w('Scheduler task {} took {:.2f}s (interval: {:.2f}s), skipping {} run(s)'.format(
+                        task.name, end - start, task.interval, missed_runs))
+                    task.next_run += missed_runs * task.interval
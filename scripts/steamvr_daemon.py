@@ -1,11 +1,13 @@
 import enum
 import os
-import subprocess
 import sys
-import threading
 import time
 
 import log
+import metrics
+from process_watcher import ProcessWatcher
+from scheduler import AdaptiveInterval
+from scheduler import Scheduler
 
 
 class SteamvrDaemon:
@@ -22,10 +24,29 @@ class SteamvrDaemon:
         self.current_stage = self.Stages.STARTUP
         self.start_of_current_stage = time.time()
 
+        self.process_watcher = ProcessWatcher(self.config.daemon_watch_process_name(),
+                                              on_change=self.handle_process_change,
+                                              method=self.config.daemon_process_watch_method(),
+                                              interval=self.config.daemon_check_interval())
+        self.scheduler = Scheduler()
+        self.check_interval = AdaptiveInterval(self.config.daemon_check_interval(),
+                                               self.config.daemon_check_interval_max())
+        self.audio_interval = AdaptiveInterval(self.config.daemon_audio_interval(),
+                                               self.config.daemon_audio_interval_max())
+
+        self.metrics_textfile = self.config.daemon_metrics_textfile()
+        self.metrics_socket = self.config.daemon_metrics_socket()
+
     def update_stage(self, new_stage):
         log.i('SteamvrDaemon changed state to: {}'.format(new_stage.name))
         self.current_stage = new_stage
         self.start_of_current_stage = time.time()
+        metrics.increment('daemon_stage_changes_total', {'stage': new_stage.name})
+
+        if new_stage == self.Stages.DURING_STEAMVR:
+            self.audio_interval.reset()
+            self.scheduler.set_interval('audio', self.audio_interval.value)
+            self.scheduler.run_now('audio')
 
     @classmethod
     def create_daemon(cls, steamvr_utils):
@@ -53,22 +74,60 @@ class SteamvrDaemon:
             sys.exit()
 
     def loop(self):
-        if self.current_stage == self.Stages.STARTUP:
-            self.steamvr_utils.turn_on()
+        """
+        Runs until the Base Stations were turned off again.
+        """
+        self.process_watcher.start()
+        self.steamvr_utils.turn_on()
+        self.current_stage = self.Stages.BEFORE_STEAMVR
+
+        self.scheduler.add('check', self.check_task, self.check_interval.value)
+        self.scheduler.add('audio', self.audio_task, self.audio_interval.value)
+        if self.metrics_textfile is not None:
+            self.scheduler.add('metrics', self.metrics_task, self.config.daemon_metrics_interval())
+        metrics_server = metrics.SocketServer(self.metrics_socket).start() if self.metrics_socket is not None else None
+
+        self.scheduler.run()
+
+        self.process_watcher.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if self.metrics_textfile is not None:
+            self.metrics_task()
+
+    def check_task(self):
+        if not self.check():
+            self.scheduler.stop()
+            return
+
+        # while SteamVR is running, its exit is noticed by self.process_watcher, not by this task
+        if self.current_stage == self.Stages.DURING_STEAMVR:
+            self.check_interval.back_off()
+        else:
+            self.check_interval.reset()
+        self.scheduler.set_interval('check', self.check_interval.value)
 
-            self.current_stage = self.Stages.BEFORE_STEAMVR
+    def audio_task(self):
+        if self.current_stage != self.Stages.DURING_STEAMVR:
+            return
 
-        continue_running = self.check()
+        # poll often after changes, less often during a long session without changes
+        if self.steamvr_utils.turn_on_iteration():
+            self.audio_interval.reset()
+        else:
+            self.audio_interval.back_off()
+        self.scheduler.set_interval('audio', self.audio_interval.value)
 
-        if self.current_stage == self.Stages.DURING_STEAMVR:
-            self.steamvr_utils.turn_on_iteration()
+    def metrics_task(self):
+        metrics.write_textfile(self.metrics_textfile)
 
-        if continue_running:
-            interval = 1
-            threading.Timer(interval, self.loop).start()
+    def handle_process_change(self, running):
+        # called by a thread of self.process_watcher, react immediately instead of at the next run of check_task()
+        self.scheduler.run_now('check')
 
     def check(self):
         steamvr_running = self.is_steamvr_running()
+        metrics.set_gauge('daemon_steamvr_running', int(steamvr_running))
 
         # log.d('Stage: {}   steamvr_running {}'.format(self.current_stage, steamvr_running))
 
@@ -85,6 +144,7 @@ class SteamvrDaemon:
         elif self.current_stage == self.Stages.DURING_STEAMVR:
             if not steamvr_running:
                 self.update_stage(self.Stages.AFTER_STEAMVR)
+                self.steamvr_utils.end_turn_on_iterations()
 
         elif self.current_stage == self.Stages.AFTER_STEAMVR:
             if steamvr_running:
@@ -97,6 +157,4 @@ class SteamvrDaemon:
         return True
 
     def is_steamvr_running(self):
-        process = subprocess.run(['ps', '-C', self.config.daemon_watch_process_name()], capture_output=True)
-        state = process.returncode == 0
-        return state
+        return self.process_watcher.is_running()
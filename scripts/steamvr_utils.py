@@ -2,12 +2,16 @@
 
 import argparse
 import enum
+import functools
 
 import audio
 import basestation_interface
 import log
+import pactl_interface
+import tracing
 from config import Config
 from config_helper import ConfigHelper
+from orchestrator import Orchestrator
 from steamvr_daemon import SteamvrDaemon
 from version import __version__
 
@@ -56,27 +60,62 @@ class SteamvrUtils:
         log.i('SteamvrUtils stating daemon:')
         SteamvrDaemon.create_daemon(self)
 
-    def turn_off(self):
-        log.i('SteamvrUtils turning off:')
+    def transition(self, name, basestation_action, device_type):
+        """
+        Changes the power state of the Base Stations, switches the sink and switches the source at the same time.
+        """
+        orchestrator = Orchestrator(name)
 
         if self.basestation_power_interface is not None:
-            self.basestation_power_interface.action(basestation_interface.Action.OFF)
+            orchestrator.add('basestation', functools.partial(self.basestation_power_interface.action,
+                                                              basestation_action),
+                             self.config.basestation_timeout())
+
+        if self.audio_switcher is not None:
+            self.audio_switcher.invalidate_state()
+            for switcher in self.audio_switcher.get_switchers():
+                orchestrator.add(switcher.get_stream_type_name(),
+                                 functools.partial(self.audio_switcher.switch, switcher, device_type),
+                                 self.config.audio_timeout())
+
+        try:
+            with tracing.Span(name, 'transition'):
+                orchestrator.run()
+        finally:
+            tracing.write()  # the daemon keeps running after turn_on()
+
+    def turn_off(self):
+        log.i('SteamvrUtils turning off:')
 
         if self.audio_switcher is not None:
-            self.audio_switcher.switch_to_normal()
+            self.audio_switcher.unsubscribe()
+
+        self.transition('turn_off', basestation_interface.Action.OFF, 'normal')
 
     def turn_on(self):
         log.i('SteamvrUtils turning on:')
 
-        if self.basestation_power_interface is not None:
-            self.basestation_power_interface.action(basestation_interface.Action.ON)
+        self.transition('turn_on', basestation_interface.Action.ON, 'vr')
 
+    def turn_on_iteration(self):
+        """
+        Returns True if anything was changed (the daemon polls more often after changes, see `SteamvrDaemon`).
+        """
         if self.audio_switcher is not None:
-            self.audio_switcher.switch_to_vr()
+            if self.config.daemon_audio_mode() == 'subscribe':
+                if not self.audio_switcher.is_subscribed():
+                    # (re)subscribe and catch up on everything that happened in the meantime
+                    self.audio_switcher.subscribe()
+                    self.audio_switcher.switch_to_vr(wait=False)
+                    return True
+            else:
+                return self.audio_switcher.switch_to_vr_if_changed() > 0
 
-    def turn_on_iteration(self):
+        return False
+
+    def end_turn_on_iterations(self):
         if self.audio_switcher is not None:
-            self.audio_switcher.switch_to_vr()
+            self.audio_switcher.unsubscribe()
 
 
 def main():
@@ -101,6 +140,10 @@ def main():
     parser.add_argument('--config',
                         default=None,
                         help='Path to a config file.')
+    parser.add_argument('--trace',
+                        default=None,
+                        help='Path of a file to which a timeline of all steps (e.g. every pactl call) is written, as '
+                             'Chrome trace-event JSON (can be opened with https://ui.perfetto.dev).')
     parser.add_argument('--version',
                         action='version',
                         version='steamvr_utils {version}'.format(version=__version__))
@@ -110,9 +153,14 @@ def main():
 
     log.initialise(config)
 
+    if args.trace is not None:
+        tracing.start(args.trace)
+
     # noinspection PyBroadException
     try:
 
+        pactl_interface.utlis.set_backend(pactl_interface.create_backend(config))
+
         selected_action = None
         for action in SteamvrUtils.Action:
             if args.action in actions[action]:
@@ -134,6 +182,8 @@ def main():
     except Exception:
         log.e('', exc_info=True)
         exit(1)
+    finally:
+        tracing.write()
 
 
 if __name__ == '__main__':
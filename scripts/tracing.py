@@ -0,0 +1,110 @@
+import collections
+import json
+import os
+import threading
+import time
+
+import log
+
+# Records nested spans (e.g. a transition, its components, every pactl call and every stream move) with microsecond
+# timestamps while enabled (see `start()`), written as Chrome trace-event JSON (see `write()`) which can be opened in
+# Perfetto (https://ui.perfetto.dev) or chrome://tracing. Spans of the same thread are nested by their timestamps.
+
+# the oldest spans are dropped (e.g. daemon ticks before turn_off), a long running daemon must not use more and more
+# memory (a span takes about 0.5 KiB)
+max_event_count = 50000
+
+_path = None
+_events = collections.deque(maxlen=max_event_count)
+_thread_names = {}  # (pid, tid) -> name
+_lock = threading.Lock()
+
+
+def get_timestamp():
+    return time.perf_counter_ns() / 1000  # microseconds, monotonic
+
+
+def start(path):
+    """
+    Records spans from now on, `write()` writes them to `path`.
+    """
+    global _path
+    _path = os.path.abspath(path)  # the daemon changes its working directory
+    log.i('Tracing to: {}'.format(_path))
+
+
+def is_enabled():
+    return _path is not None
+
+
+class Span:
+    """
+    Context manager which records the time its body took as a span, if tracing is enabled.
+    `args` (a dict) are shown with the span, more can be added to `span.args` inside the body.
+    """
+
+    def __init__(self, name, category, args=None):
+        self.name = name
+        self.category = category
+        self.args = dict(args) if args is not None else {}
+        self.start = None
+
+    def __enter__(self):
+        if _path is not None:
+            self.start = get_timestamp()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is None:
+            return
+
+        if exc_value is not None:
+            self.args['error'] = str(exc_value)
+        add_event({
+            'name': self.name,
+            'cat': self.category,
+            'ph': 'X',  # complete event (with a duration)
+            'ts': self.start,
+            'dur': get_timestamp() - self.start,
+            'args': self.args,
+        })
+
+
+def add_event(event):
+    thread = threading.current_thread()
+    pid = os.getpid()
+    event['pid'] = pid
+    event['tid'] = thread.ident
+
+    with _lock:
+        _events.append(event)
+        _thread_names[(pid, thread.ident)] = thread.name
+
+
+def write():
+    """
+    Writes all recorded spans to the path given to `start()`, replacing previous versions of the file.
+    """
+    if _path is None:
+        return
+
+    with _lock:
+        events = list(_events)
+        thread_names = dict(_thread_names)
+
+    # metadata events, to show the names of the processes and threads in the timeline
+    events += [
+        {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'steamvr_utils ({})'.format(pid)}}
+        for pid in sorted(set(pid for pid, _ in thread_names))
+    ]
+    events += [
+        {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+        for (pid, tid), name in thread_names.items()
+    ]
+
+    # several processes might write at the same time (see SteamvrDaemon.create_daemon)
+    temporary_path = '{}.{}.tmp'.format(_path, os.getpid())
+    with open(temporary_path, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file, separators=(',', ':'))
+    os.replace(temporary_path, _path)
+    log.i('Wrote {} trace events to: {}'.format(len(events), _path))